@@ -73,6 +73,47 @@ DATA_FILE = os.path.join(DATA_DIR, "data.json")
 BANNED_FILE = os.path.join(DATA_DIR, "banned.json")
 LOG_FILE = os.path.join(DATA_DIR, "bot.log")
 
+# Storage backend:
+#   json   - in-memory store persisted to data.json (see DATA_PERSIST_MODE)
+#   sqlite - embedded SQLite database (data.db), data.json imported on first start
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "json").lower()
+if STORAGE_BACKEND not in ("json", "sqlite"):
+    raise ValueError(f"STORAGE_BACKEND '{STORAGE_BACKEND}' must be 'json' or 'sqlite'")
+SQLITE_FILE = os.path.join(DATA_DIR, "data.db")
+
+# Storage persistence mode (json backend):
+#   immediate - rewrite data.json on every change
+#   journal   - append one record per change to data.journal (snapshot written on shutdown)
+#   deferred  - only mark data dirty, flush at most once per AUTO_SAVE_INTERVAL and on shutdown
+DATA_PERSIST_MODE = os.getenv("DATA_PERSIST_MODE", "immediate").lower()
+if DATA_PERSIST_MODE not in ("immediate", "journal", "deferred"):
+    raise ValueError(f"DATA_PERSIST_MODE '{DATA_PERSIST_MODE}' must be 'immediate', 'journal' or 'deferred'")
+DATA_JOURNAL_FILE = os.path.join(DATA_DIR, "data.journal")
+# Full-text index for admin ticket search (rebuilt automatically if missing).
+# Index paths have no extension: .json or .msgpack is added to match DATA_FORMAT
+SEARCH_INDEX_FILE = os.path.join(DATA_DIR, "search_index")
+# Usernames and user ids for admin user lookup (rebuilt automatically if missing)
+USER_INDEX_FILE = os.path.join(DATA_DIR, "user_index")
+
+# data.json encoding (json backend): json (compact), orjson (faster) or msgpack (binary).
+# Existing files in any format are detected on load and rewritten on next save
+DATA_FORMAT = os.getenv("DATA_FORMAT", "json").lower()
+if DATA_FORMAT not in ("json", "orjson", "msgpack"):
+    raise ValueError(f"DATA_FORMAT '{DATA_FORMAT}' must be 'json', 'orjson' or 'msgpack'")
+# On-disk layout (json backend): single data.json, or sharded - one file per month
+# of tickets plus users file and manifest in DATA_DIR/shards (data.json is split on first start)
+DATA_LAYOUT = os.getenv("DATA_LAYOUT", "single").lower()
+if DATA_LAYOUT not in ("single", "sharded"):
+    raise ValueError(f"DATA_LAYOUT '{DATA_LAYOUT}' must be 'single' or 'sharded'")
+SHARDS_DIR = os.path.join(DATA_DIR, "shards")
+# data.json files at least this large (MB) are loaded ticket by ticket to limit peak memory
+STREAM_LOAD_MIN_MB = int(os.getenv("STREAM_LOAD_MIN_MB", "64"))
+
+# Cold archive (json backend): closed tickets inactive for this many days are moved
+# out of memory into compressed segments in DATA_DIR/archive (0 = disabled)
+ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", "0"))
+ARCHIVE_DIR = os.path.join(DATA_DIR, "archive")
+
 # Backup directory
 BACKUP_DIR = os.path.join(DATA_DIR, "backups")
 os.makedirs(BACKUP_DIR, exist_ok=True)
@@ -91,7 +132,18 @@ RATING_ENABLED = os.getenv("RATING_ENABLED", "true").lower() == "true"
 
 # ========== AUTOMATION ==========
 
+# Flush interval in seconds for DATA_PERSIST_MODE=deferred
 AUTO_SAVE_INTERVAL = int(os.getenv("AUTO_SAVE_INTERVAL", "300"))
+# Interval in seconds for folding data.journal into a snapshot (SQLite: WAL checkpoint)
+COMPACT_INTERVAL = int(os.getenv("COMPACT_INTERVAL", "3600"))
+# Interval in seconds for saving search and user indexes (also saved on shutdown)
+SEARCH_INDEX_SAVE_INTERVAL = int(os.getenv("SEARCH_INDEX_SAVE_INTERVAL", "300"))
+
+# Number of Telegram updates processed in parallel (1 = one at a time).
+# Ticket updates are versioned and handlers are serialized per ticket, so higher values are safe
+CONCURRENT_UPDATES = int(os.getenv("CONCURRENT_UPDATES", "1"))
+if CONCURRENT_UPDATES < 1:
+    raise ValueError("CONCURRENT_UPDATES must be at least 1")
 
 # ========== BAN DETECTION & MANAGEMENT ==========
 
@@ -112,6 +164,15 @@ BACKUP_FILE_PREFIX = os.getenv("BACKUP_FILE_PREFIX", "backup")
 BACKUP_FULL_PROJECT = os.getenv("BACKUP_FULL_PROJECT", "false").lower() == "true"
 BACKUP_FILE_LIST = os.getenv("BACKUP_FILE_LIST", "data.json,banned.json")
 BACKUP_FILE_LIST = [f.strip() for f in BACKUP_FILE_LIST.split(",")] if BACKUP_FILE_LIST else []
+# Journal holds changes not yet in data.json - back it up together with the snapshot
+if DATA_PERSIST_MODE == "journal" and "data.json" in BACKUP_FILE_LIST and "data.journal" not in BACKUP_FILE_LIST:
+    BACKUP_FILE_LIST.append("data.journal")
+if STORAGE_BACKEND == "sqlite" and "data.json" in BACKUP_FILE_LIST and "data.db" not in BACKUP_FILE_LIST:
+    BACKUP_FILE_LIST.append("data.db")
+if DATA_LAYOUT == "sharded" and "data.json" in BACKUP_FILE_LIST and "shards" not in BACKUP_FILE_LIST:
+    BACKUP_FILE_LIST.append("shards")
+if ARCHIVE_AFTER_DAYS > 0 and "data.json" in BACKUP_FILE_LIST and "archive" not in BACKUP_FILE_LIST:
+    BACKUP_FILE_LIST.append("archive")
 BACKUP_EXCLUDE_PATTERNS = [p.strip() for p in os.getenv("BACKUP_EXCLUDE_PATTERNS", "backups,bot.log,__pycache__,.git,.pyc,venv,*.log").split(",") if p.strip()]
 BACKUP_SEND_TO_TELEGRAM = os.getenv("BACKUP_SEND_TO_TELEGRAM", "false").lower() == "true"
 BACKUP_MAX_SIZE_MB = int(os.getenv("BACKUP_MAX_SIZE_MB", "100"))
@@ -285,9 +346,16 @@ async def post_init(application):
     except Exception as e:
         logger.error(f"Failed to configure alert service: {e}", exc_info=True)
 
+    # Load ticket search index and user index (both catch up on tickets changed since saved)
+    try:
+        from services.search import search_index, user_index
+        search_index.load()
+        user_index.load()
+    except Exception as e:
+        logger.error(f"Failed to load search index: {e}", exc_info=True)
+
     # Start scheduler
     from services.scheduler import scheduler_service
-    from services.ticket_auto_close import auto_close_inactive_tickets
 
     await scheduler_service.start()
     logger.info("Scheduler service started")
@@ -345,14 +413,65 @@ async def post_init(application):
         )
         logger.info("Added job: cleanup_backups (interval: 86400s)")
 
-        # Auto-close tickets job
+        # Auto-close tickets: wakes at the next deadline (overdue tickets are closed right away)
+        from services.ticket_auto_close import start_auto_close
+        start_auto_close()
+        logger.info("Started auto-close deadline loop")
+
+        # Deferred persistence flush job
+        if DATA_PERSIST_MODE == "deferred":
+            async def auto_save_async():
+                from storage.data_manager import data_manager
+                await data_manager.flush_async()
+
+            await scheduler_service.add_job(
+                "auto_save",
+                auto_save_async,
+                AUTO_SAVE_INTERVAL,
+                run_immediately=False
+            )
+            logger.info(f"Added job: auto_save (interval: {AUTO_SAVE_INTERVAL}s)")
+
+        # Search and user indexes are saved on their own schedule (and on shutdown)
+        async def save_search_index_async():
+            from services.search import search_index, user_index
+            await search_index.save_async()
+            await user_index.save_async()
+
         await scheduler_service.add_job(
-            "auto_close_tickets",
-            auto_close_inactive_tickets,
-            3600,  # 1 hour
-            run_immediately=True  # Check immediately on startup
+            "save_search_index",
+            save_search_index_async,
+            SEARCH_INDEX_SAVE_INTERVAL,
+            run_immediately=False
+        )
+        logger.info(f"Added job: save_search_index (interval: {SEARCH_INDEX_SAVE_INTERVAL}s)")
+
+        # Storage compaction - also runs once at startup to fold leftover journal
+        async def compact_storage_async():
+            from storage.data_manager import data_manager
+            await data_manager.compact_async()
+
+        await scheduler_service.add_job(
+            "compact_storage",
+            compact_storage_async,
+            COMPACT_INTERVAL,
+            run_immediately=True
         )
-        logger.info("Added job: auto_close_tickets (interval: 3600s)")
+        logger.info(f"Added job: compact_storage (interval: {COMPACT_INTERVAL}s)")
+
+        # Move old closed tickets to the cold archive
+        if ARCHIVE_AFTER_DAYS > 0:
+            async def archive_tickets_async():
+                from storage.data_manager import data_manager
+                await data_manager.archive_closed_tickets_async(ARCHIVE_AFTER_DAYS)
+
+            await scheduler_service.add_job(
+                "archive_tickets",
+                archive_tickets_async,
+                86400,  # 24 hours
+                run_immediately=True
+            )
+            logger.info(f"Added job: archive_tickets (interval: 86400s, after {ARCHIVE_AFTER_DAYS} days)")
 
     except Exception as e:
         logger.error(f"Failed to add scheduler jobs: {e}")
@@ -376,6 +495,15 @@ async def post_init(application):
         except Exception as e:
             logger.error(f"Failed to create startup backup: {e}")
 
+    # Report storage files recovered on load
+    try:
+        from storage.data_manager import data_manager
+        if data_manager.recovery:
+            from services.alerts import alert_service
+            await alert_service.send_data_recovery_alert(data_manager.recovery)
+    except Exception as e:
+        logger.error(f"Failed to send data recovery alert: {e}", exc_info=True)
+
     # Send startup alert (at the end)
     try:
         from services.alerts import alert_service
@@ -393,11 +521,24 @@ async def post_shutdown(application):
     await scheduler_service.stop()
     logger.info("Scheduler service stopped")
 
-    # Save data
+    # Stop auto-close deadline loop
+    from services.deadlines import auto_close_deadlines
+    await auto_close_deadlines.stop()
+
+    # Save data (waits for any background save still in progress)
     from storage.data_manager import data_manager
-    data_manager.save()
+    await data_manager.save_async()
     logger.info("Data saved on shutdown")
 
+    # Save search and user indexes
+    try:
+        from services.search import search_index, user_index
+        await search_index.save_async()
+        await user_index.save_async()
+        logger.info("Search indexes saved on shutdown")
+    except Exception as e:
+        logger.error(f"Failed to save search index: {e}", exc_info=True)
+
     logger.info("Shutdown complete")
 
 
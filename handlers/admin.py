@@ -1,3 +1,4 @@
+import html
 import logging
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, ReplyKeyboardRemove
 from telegram.ext import ContextTypes
@@ -6,6 +7,7 @@ from locales import get_text
 from utils.locale_helper import get_user_language, get_admin_language
 from services.tickets import ticket_service
 from services.bans import ban_manager
+from services.search import search_index, user_index
 from storage.data_manager import data_manager
 from storage.instruction_store import ADMIN_SCREEN_MESSAGES
 from utils.formatters import format_ticket_brief, format_ticket_card, format_ticket_preview
@@ -13,6 +15,9 @@ from utils.admin_screen import show_admin_screen, reset_admin_screen, clear_all_
 
 logger = logging.getLogger(__name__)
 
+# Tickets matched by partial number shown before text matches
+SEARCH_ID_RESULTS = 50
+
 
 async def inbox_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle incoming tickets inbox"""
@@ -23,6 +28,8 @@ async def inbox_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     context.user_data["inbox_filter"] = "all"
     context.user_data["inbox_page"] = 0
+    context.user_data["inbox_cursor"] = None
+    context.user_data["inbox_newer"] = False
 
     await show_inbox(update, context)
 
@@ -37,24 +44,27 @@ async def show_inbox(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     filter_status = context.user_data.get("inbox_filter", "all")
     page = context.user_data.get("inbox_page", 0)
-
-    # Fetch tickets based on filter status
-    if filter_status == "all":
-        tickets = data_manager.get_all_tickets()
-    else:
-        tickets = data_manager.get_tickets_by_status(filter_status)
-
-    # Sort tickets by creation date (newest first)
-    tickets = sorted(tickets, key=lambda t: t.created_at, reverse=True)
+    cursor = context.user_data.get("inbox_cursor")
+    newer = context.user_data.get("inbox_newer", False)
+
+    # Fetch one page, newest first (storage keeps tickets sorted by creation date)
+    status = None if filter_status == "all" else filter_status
+    try:
+        result = data_manager.get_tickets_page(status, cursor, PAGE_SIZE, newer)
+    except ValueError:
+        # Stale or damaged cursor - start from the first page
+        result = data_manager.get_tickets_page(status, None, PAGE_SIZE)
+    if result.newer is None:
+        page = 0
+        context.user_data["inbox_page"] = 0
 
     # Calculate pagination
-    total_tickets = len(tickets)
+    total_tickets = result.total
     total_pages = max(1, (total_tickets + PAGE_SIZE - 1) // PAGE_SIZE)
-    start_idx = page * PAGE_SIZE
-    end_idx = min(start_idx + PAGE_SIZE, total_tickets)
-    page_tickets = tickets[start_idx:end_idx]
+    page = min(page, total_pages - 1)
+    page_tickets = result.tickets
 
-    logger.info(f"🔍 DEBUG: total_tickets={total_tickets}, page={page}, start_idx={start_idx}, end_idx={end_idx}, showing={len(page_tickets)}")
+    logger.info(f"🔍 DEBUG: total_tickets={total_tickets}, page={page}, showing={len(page_tickets)}")
 
     # Translate filter status names
     filter_names = {
@@ -86,11 +96,12 @@ async def show_inbox(update: Update, context: ContextTypes.DEFAULT_TYPE):
         )
 
     # Build pagination buttons
+    # Buttons carry keyset cursors of neighbour pages
     nav_row = []
-    if page > 0:
-        nav_row.append(InlineKeyboardButton(get_text('buttons.back', lang=user_lang), callback_data=f"inbox_page:{page-1}"))
-    if page < total_pages - 1:
-        nav_row.append(InlineKeyboardButton(get_text('buttons.forward', lang=user_lang), callback_data=f"inbox_page:{page+1}"))
+    if result.newer:
+        nav_row.append(InlineKeyboardButton(get_text('buttons.back', lang=user_lang), callback_data=f"inbox_page:newer:{result.newer}"))
+    if result.older:
+        nav_row.append(InlineKeyboardButton(get_text('buttons.forward', lang=user_lang), callback_data=f"inbox_page:older:{result.older}"))
 
     # Search button (with localization)
     search_row = [InlineKeyboardButton(get_text("search.button", lang=user_lang), callback_data="search_ticket_start")]
@@ -110,6 +121,98 @@ async def show_inbox(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await show_admin_screen(update, context, text, keyboard, screen_type="inbox")
 
 
+def build_search_results(context: ContextTypes.DEFAULT_TYPE, page: int):
+    """Text and keyboard for one page of search results saved in user_data"""
+    user_lang = get_admin_language()
+    query = context.user_data.get("search_query", "")
+    results = context.user_data.get("search_results", [])
+    users = context.user_data.get("search_users", [])
+
+    new_search_row = [
+        InlineKeyboardButton(text=get_text("search.button_new_search", lang=user_lang), callback_data="search_ticket_start"),
+        InlineKeyboardButton(text=get_text("search.button_cancel", lang=user_lang), callback_data="admin_inbox")
+    ]
+    if not results and not users:
+        text = get_text("search.not_found", lang=user_lang, query=html.escape(query))
+        return text, InlineKeyboardMarkup([new_search_row])
+
+    total_pages = max(1, (len(results) + PAGE_SIZE - 1) // PAGE_SIZE)
+    page = max(0, min(page, total_pages - 1))
+    context.user_data["search_page"] = page
+
+    rows = [
+        [InlineKeyboardButton(_user_label(user_id), callback_data=f"user_tickets:{user_id}:0")]
+        for user_id in users
+    ]
+    previews = []
+    for ticket_id in results[page * PAGE_SIZE:(page + 1) * PAGE_SIZE]:
+        ticket = data_manager.get_ticket(ticket_id)
+        if not ticket:
+            # Deleted from storage after it was indexed
+            search_index.remove_ticket(ticket_id)
+            continue
+        previews.append(format_ticket_preview(ticket))
+        rows.append([InlineKeyboardButton(f"📋 {ticket.id}", callback_data=f"ticket:{ticket.id}")])
+
+    header = get_text("search.results", lang=user_lang, query=html.escape(query), count=len(results))
+    if total_pages > 1:
+        header += f" | {get_text('inbox.page', lang=user_lang, page=page + 1, total=total_pages)}"
+    text = header + "\n\n" + "\n".join(previews)
+
+    nav_row = []
+    if page > 0:
+        nav_row.append(InlineKeyboardButton(get_text('buttons.back', lang=user_lang), callback_data=f"search_page:{page - 1}"))
+    if page < total_pages - 1:
+        nav_row.append(InlineKeyboardButton(get_text('buttons.forward', lang=user_lang), callback_data=f"search_page:{page + 1}"))
+    if nav_row:
+        rows.append(nav_row)
+    rows.append(new_search_row)
+
+    return text, InlineKeyboardMarkup(rows)
+
+
+def _user_label(user_id: int) -> str:
+    """Button text for user: @username (ID:123) or ID:123"""
+    username = user_index.username(user_id)
+    return f"👤 @{username} (ID:{user_id})" if username else f"👤 ID:{user_id}"
+
+
+async def show_user_tickets(update: Update, context: ContextTypes.DEFAULT_TYPE, user_id: int, page: int = 0):
+    """Display all tickets of one user (archived included), newest first"""
+    user_lang = get_admin_language()
+
+    # Ids come from indexes; only tickets of the shown page are loaded
+    ticket_ids = data_manager.get_user_ticket_ids(user_id)
+    total_pages = max(1, (len(ticket_ids) + PAGE_SIZE - 1) // PAGE_SIZE)
+    page = max(0, min(page, total_pages - 1))
+    page_tickets = [data_manager.get_ticket(tid) for tid in ticket_ids[page * PAGE_SIZE:(page + 1) * PAGE_SIZE]]
+    page_tickets = [t for t in page_tickets if t is not None]
+
+    header = get_text("search.user_tickets", lang=user_lang, user=_user_label(user_id), count=len(ticket_ids))
+    if total_pages > 1:
+        header += f" | {get_text('inbox.page', lang=user_lang, page=page + 1, total=total_pages)}"
+    if page_tickets:
+        text = header + "\n\n" + "\n".join(format_ticket_preview(t) for t in page_tickets)
+    else:
+        text = header + "\n\n" + get_text("inbox.no_tickets", lang=user_lang)
+
+    rows = [[InlineKeyboardButton(f"📋 {t.id}", callback_data=f"ticket:{t.id}")] for t in page_tickets]
+
+    nav_row = []
+    if page > 0:
+        nav_row.append(InlineKeyboardButton(get_text('buttons.back', lang=user_lang), callback_data=f"user_tickets:{user_id}:{page - 1}"))
+    if page < total_pages - 1:
+        nav_row.append(InlineKeyboardButton(get_text('buttons.forward', lang=user_lang), callback_data=f"user_tickets:{user_id}:{page + 1}"))
+    if nav_row:
+        rows.append(nav_row)
+    rows.append([
+        InlineKeyboardButton(text=get_text("search.button_new_search", lang=user_lang), callback_data="search_ticket_start"),
+        InlineKeyboardButton(get_text('buttons.main_menu', lang=user_lang), callback_data="admin_home")
+    ])
+
+    await show_admin_screen(update, context, text, InlineKeyboardMarkup(rows), screen_type="user_tickets")
+
+
 async def show_ticket_card(update: Update, context: ContextTypes.DEFAULT_TYPE, ticket_id: str):
     """Display full ticket card"""
     user = update.effective_user
@@ -219,19 +322,24 @@ async def admin_text_handler(update: Update, context: ContextTypes.DEFAULT_TYPE)
     state = context.user_data.get("state")
     logger.info(f"🔍 DEBUG admin_text_handler: user_id={user.id}, state={state}, text={text[:20]}")
 
-    # Search ticket by ID
+    # Search tickets by text, username, user ID or ticket number
     if state == "search_ticket_input":
-        search_input = text.strip().replace("#", "")
-        tickets_list = data_manager.get_all_tickets()
-
-        # Find ticket by ID match
-        found_ticket = None
-        for ticket in tickets_list:
-            if search_input in ticket.id:
-                found_ticket = ticket
-                break
+        search_input = text.strip()
+        # Ticket numbers typed partially ("0412", "20251110-00") first, then text matches.
+        # Only ids here - tickets of the shown page are loaded by build_search_results
+        results = data_manager.match_ticket_ids(search_input, SEARCH_ID_RESULTS)
+        results += [ticket_id for ticket_id in search_index.search(search_input) if ticket_id not in results]
+        if not results:
+            # Fragment from the middle of an ID - match by ID substring (includes archived tickets)
+            found_ticket = data_manager.find_ticket(search_input.replace("#", ""))
+            if found_ticket:
+                results = [found_ticket.id]
 
         context.user_data["state"] = None
+        context.user_data["search_query"] = search_input
+        context.user_data["search_results"] = results
+        # Users with matching @username / user id, each opens their tickets
+        context.user_data["search_users"] = user_index.search(search_input)
 
         # GET SAVED message_id (SAME MESSAGE)
         search_menu_msg_id = context.user_data.get("search_menu_msg_id")
@@ -243,67 +351,31 @@ async def admin_text_handler(update: Update, context: ContextTypes.DEFAULT_TYPE)
         except Exception as e:
             logger.debug(f"Search input message already deleted: {e}")
 
+        result_text, keyboard = build_search_results(context, 0)
+
         # EDIT IN PLACE (don't create new message!)
         if search_menu_msg_id:
-            if not found_ticket:
-                try:
-                    await context.bot.edit_message_text(
-                        chat_id=ADMIN_ID,
-                        message_id=search_menu_msg_id,
-                        text=get_text("search.not_found", lang=user_lang, ticket_number=search_input),
-                        reply_markup=InlineKeyboardMarkup([[
-                            InlineKeyboardButton(text=get_text("search.button_new_search", lang=user_lang), callback_data="search_ticket_start"),
-                            InlineKeyboardButton(text=get_text("search.button_cancel", lang=user_lang), callback_data="admin_inbox")
-                        ]]),
-                        parse_mode='HTML'
-                    )
-                    logger.info(f"✅ Updated search result (not found): {search_menu_msg_id}")
-                    return
-                except Exception as e:
-                    logger.error(f"Failed to edit search result: {e}")
-            else:
-                # Ticket found - edit in place
-                try:
-                    await context.bot.edit_message_text(
-                        chat_id=ADMIN_ID,
-                        message_id=search_menu_msg_id,
-                        text=format_ticket_preview(found_ticket),
-                        reply_markup=InlineKeyboardMarkup([
-                            [InlineKeyboardButton(text=get_text("search.button_open", lang=user_lang), callback_data=f"ticket:{found_ticket.id}")],
-                            [
-                                InlineKeyboardButton(text=get_text("search.button_new_search", lang=user_lang), callback_data="search_ticket_start"),
-                                InlineKeyboardButton(text=get_text("search.button_cancel", lang=user_lang), callback_data="admin_inbox")
-                            ]
-                        ]),
-                        parse_mode='HTML'
-                    )
-                    logger.info(f"✅ Updated search result (found): {search_menu_msg_id}")
-                    return
-                except Exception as e:
-                    logger.error(f"Failed to edit search result: {e}")
+            try:
+                await context.bot.edit_message_text(
+                    chat_id=ADMIN_ID,
+                    message_id=search_menu_msg_id,
+                    text=result_text,
+                    reply_markup=keyboard,
+                    parse_mode='HTML'
+                )
+                logger.info(f"✅ Updated search result ({len(results)} found): {search_menu_msg_id}")
+                return
+            except Exception as e:
+                logger.error(f"Failed to edit search result: {e}")
 
         # Fallback: если нет search_menu_msg_id Create new message
-        if not found_ticket:
-            msg = await context.bot.send_message(
-                chat_id=ADMIN_ID,
-                text=get_text("search.not_found", lang=user_lang, ticket_number=search_input),
-                reply_markup=InlineKeyboardMarkup([[
-                    InlineKeyboardButton(text=get_text("search.button_new_search", lang=user_lang), callback_data="search_ticket_start"),
-                    InlineKeyboardButton(text=get_text("search.button_cancel", lang=user_lang), callback_data="admin_inbox")
-                ]])
-            )
-        else:
-            msg = await context.bot.send_message(
-                chat_id=ADMIN_ID,
-                text=format_ticket_preview(found_ticket),
-                reply_markup=InlineKeyboardMarkup([
-                    [InlineKeyboardButton(text=get_text("search.button_open", lang=user_lang), callback_data=f"ticket:{found_ticket.id}")],
-                    [
-                        InlineKeyboardButton(text=get_text("search.button_new_search", lang=user_lang), callback_data="search_ticket_start"),
-                        InlineKeyboardButton(text=get_text("search.button_cancel", lang=user_lang), callback_data="admin_inbox")
-                    ]
-                ])
-            )
+        msg = await context.bot.send_message(
+            chat_id=ADMIN_ID,
+            text=result_text,
+            reply_markup=keyboard,
+            parse_mode='HTML'
+        )
+        context.user_data["search_menu_msg_id"] = msg.message_id
         return
 
     # Handle ban user ID input
@@ -33,8 +33,11 @@ async def callback_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     except Exception as e:
         logger.warning(f"⚠️ Failed to answer callback query: {e}")
 
-    # Route to ticket view
+    # Route to ticket view (buttons may be in any chat, e.g. posted via inline mode)
     if data.startswith("ticket:"):
+        if user.id != ADMIN_ID:
+            logger.warning(f"User {user.id} pressed ticket button without admin rights")
+            return
         ticket_id = data.split(":")[1]
         from handlers.admin import show_ticket_card
         await show_ticket_card(update, context, ticket_id)
@@ -364,6 +367,18 @@ async def callback_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await handle_inbox_page(update, context, data)
         return
 
+    # Paginate search results
+    elif data.startswith("search_page:"):
+        await handle_search_page(update, context, data)
+        return
+
+    # Tickets of one user (from search results)
+    elif data.startswith("user_tickets:"):
+        _, user_id, page = data.split(":")
+        from handlers.admin import show_user_tickets
+        await show_user_tickets(update, context, int(user_id), int(page))
+        return
+
     # Admin home
     elif data == "admin_home":
         admin_lang = get_admin_language()
@@ -416,6 +431,39 @@ async def handle_admin_inbox(update: Update, context: ContextTypes.DEFAULT_TYPE)
     await show_inbox(update, context)
 
 
+async def handle_inbox_filter(update: Update, context: ContextTypes.DEFAULT_TYPE, data: str):
+    """Switch inbox filter and go to its first page"""
+    from handlers.admin import show_inbox
+    context.user_data["inbox_filter"] = data.split(":", 1)[1]
+    context.user_data["inbox_page"] = 0
+    context.user_data["inbox_cursor"] = None
+    context.user_data["inbox_newer"] = False
+    await show_inbox(update, context)
+
+
+async def handle_inbox_page(update: Update, context: ContextTypes.DEFAULT_TYPE, data: str):
+    """Go to newer or older inbox page (callback data: inbox_page:<newer|older>:<cursor>)"""
+    from handlers.admin import show_inbox
+    _, direction, cursor = data.split(":", 2)
+    newer = direction == "newer"
+    page = context.user_data.get("inbox_page", 0)
+    context.user_data["inbox_page"] = max(0, page - 1) if newer else page + 1
+    context.user_data["inbox_cursor"] = cursor
+    context.user_data["inbox_newer"] = newer
+    await show_inbox(update, context)
+
+
+async def handle_search_page(update: Update, context: ContextTypes.DEFAULT_TYPE, data: str):
+    """Show another page of search results (callback data: search_page:<page>)"""
+    from handlers.admin import build_search_results
+    text, keyboard = build_search_results(context, int(data.split(":", 1)[1]))
+    try:
+        await update.callback_query.edit_message_text(text=text, reply_markup=keyboard, parse_mode='HTML')
+    except Exception as e:
+        if "Message is not modified" not in str(e):
+            logger.warning(f"⚠️ Failed to show search page: {e}")
+
+
 async def handle_admin_stats(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Display statistics for admin"""
     user = update.effective_user
@@ -0,0 +1,54 @@
+import logging
+from telegram import (
+    Update, InlineKeyboardButton, InlineKeyboardMarkup,
+    InlineQueryResultArticle, InputTextMessageContent
+)
+from telegram.ext import ContextTypes
+from config import ADMIN_ID
+from locales import get_text
+from utils.locale_helper import get_admin_language
+from storage.data_manager import data_manager
+from utils.formatters import format_ticket_brief
+
+logger = logging.getLogger(__name__)
+
+# Tickets shown while admin types (Telegram allows up to 50)
+INLINE_RESULTS = 10
+
+
+async def inline_query_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Ticket lookup as admin types "@bot 0412" in any chat (inline mode)"""
+    inline_query = update.inline_query
+
+    if inline_query.from_user.id != ADMIN_ID:
+        await inline_query.answer([], cache_time=0, is_personal=True)
+        return
+
+    user_lang = get_admin_language()
+    fragment = inline_query.query.strip()
+    if fragment:
+        tickets = data_manager.find_tickets(fragment, INLINE_RESULTS)
+    else:
+        # Nothing typed yet - newest tickets
+        tickets = data_manager.get_tickets_page(None, None, INLINE_RESULTS).tickets
+
+    results = []
+    for ticket in tickets:
+        brief = format_ticket_brief(ticket)
+        # Brief line is "<emoji> <id> | <user> | <text>": id as title, the rest below.
+        # Only admin sees it - the chat gets just the ticket id, opened by admin via the button
+        title, _, description = brief.partition(" | ")
+        results.append(InlineQueryResultArticle(
+            id=ticket.id,
+            title=title,
+            description=description,
+            input_message_content=InputTextMessageContent(
+                get_text("search.inline_reference", lang=user_lang, ticket_id=ticket.id)
+            ),
+            reply_markup=InlineKeyboardMarkup([[
+                InlineKeyboardButton(get_text("search.button_open", lang=user_lang), callback_data=f"ticket:{ticket.id}")
+            ]])
+        ))
+
+    logger.debug(f"Inline query {fragment!r}: {len(results)} tickets")
+    await inline_query.answer(results, cache_time=0, is_personal=True)
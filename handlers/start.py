@@ -42,8 +42,7 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
 
     # Load user's saved locale
-    user_data = data_manager.get_user_data(user.id)
-    user_locale = user_data.get("locale", DEFAULT_LOCALE)
+    user_locale = data_manager.get_user_locale(user.id) or DEFAULT_LOCALE
 
     set_user_locale(user.id, user_locale)
     set_locale(user_locale)
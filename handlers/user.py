@@ -21,11 +21,7 @@ async def send_or_update_ticket_card(context: ContextTypes.DEFAULT_TYPE, ticket_
     """Send or update ticket card to admin"""
     try:
         # Find ticket by ID
-        ticket = None
-        for t in data_manager.get_all_tickets():
-            if t.id == ticket_id:
-                ticket = t
-                break
+        ticket = data_manager.get_ticket(ticket_id)
 
         if not ticket:
             logger.error(f"Ticket {ticket_id} not found")
@@ -388,34 +384,36 @@ async def handle_ticket_message(update: Update, context: ContextTypes.DEFAULT_TY
     # Get user language
     user_lang = get_user_language(user.id)
 
-    # Add message to ticket
-    ticket_service.add_message(ticket_id, "user", text)
+    # Messages of one ticket are stored and shown to admin in order
+    async with ticket_service.ticket_lock(ticket_id):
+        # Add message to ticket
+        ticket_service.add_message(ticket_id, "user", text)
 
-    # Confirm to user
-    await update.message.reply_text(get_text("messages.message_sent", lang=user_lang), reply_markup=ReplyKeyboardRemove())
+        # Confirm to user
+        await update.message.reply_text(get_text("messages.message_sent", lang=user_lang), reply_markup=ReplyKeyboardRemove())
 
-    # Get admin language
-    admin_lang = get_admin_language()
+        # Get admin language
+        admin_lang = get_admin_language()
 
-    # Create button to open ticket
-    keyboard = InlineKeyboardMarkup([
-        [InlineKeyboardButton(get_text('search.button_open', lang=admin_lang), callback_data=f"ticket:{ticket_id}")]
-    ])
+        # Create button to open ticket
+        keyboard = InlineKeyboardMarkup([
+            [InlineKeyboardButton(get_text('search.button_open', lang=admin_lang), callback_data=f"ticket:{ticket_id}")]
+        ])
 
-    try:
-        # Send notification to admin
-        await context.bot.send_message(
-            chat_id=ADMIN_ID,
-            text=f"👤 @{user.username or 'unknown'} (ID: {user.id}):\n\n{text}",
-            reply_markup=keyboard
-        )
-        logger.info(f"Message sent to admin from user {user.id}")
-    except Exception as e:
-        logger.error(f"Failed to send message to admin: {e}")
+        try:
+            # Send notification to admin
+            await context.bot.send_message(
+                chat_id=ADMIN_ID,
+                text=f"👤 @{user.username or 'unknown'} (ID: {user.id}):\n\n{text}",
+                reply_markup=keyboard
+            )
+            logger.info(f"Message sent to admin from user {user.id}")
+        except Exception as e:
+            logger.error(f"Failed to send message to admin: {e}")
 
-    # Update ticket card
-    message_id = TICKET_CARD_MESSAGES.get(ticket_id)
-    await send_or_update_ticket_card(context, ticket_id, action="message", message_id=message_id)
+        # Update ticket card
+        message_id = TICKET_CARD_MESSAGES.get(ticket_id)
+        await send_or_update_ticket_card(context, ticket_id, action="message", message_id=message_id)
 
 
 async def handle_admin_reply(update: Update, context: ContextTypes.DEFAULT_TYPE, text: str):
@@ -426,40 +424,41 @@ async def handle_admin_reply(update: Update, context: ContextTypes.DEFAULT_TYPE,
     if not ticket_id:
         return
 
-    # Add reply to ticket
-    ticket = ticket_service.add_message(ticket_id, "support", text, ADMIN_ID)
+    async with ticket_service.ticket_lock(ticket_id):
+        # Add reply to ticket
+        ticket = ticket_service.add_message(ticket_id, "support", text, ADMIN_ID)
 
-    if not ticket:
-        user_lang = get_user_language(update.effective_user.id)
-        await update.message.reply_text(get_text("messages.ticket_not_found", lang=user_lang), reply_markup=ReplyKeyboardRemove())
-        return
+        if not ticket:
+            user_lang = get_user_language(update.effective_user.id)
+            await update.message.reply_text(get_text("messages.ticket_not_found", lang=user_lang), reply_markup=ReplyKeyboardRemove())
+            return
 
-    # Get user language for user message
-    user_lang = get_user_language(ticket.user_id)
+        # Get user language for user message
+        user_lang = get_user_language(ticket.user_id)
 
-    # Clear state
-    context.user_data["state"] = None
-    context.user_data["reply_ticket_id"] = None
+        # Clear state
+        context.user_data["state"] = None
+        context.user_data["reply_ticket_id"] = None
 
-    # Get admin language
-    admin_lang = get_admin_language()
+        # Get admin language
+        admin_lang = get_admin_language()
 
-    # Confirm to admin
-    await update.message.reply_text(get_text("messages.answer_sent", lang=admin_lang), reply_markup=ReplyKeyboardRemove())
+        # Confirm to admin
+        await update.message.reply_text(get_text("messages.answer_sent", lang=admin_lang), reply_markup=ReplyKeyboardRemove())
 
-    try:
-        # Send answer to user in their language
-        await context.bot.send_message(
-            chat_id=ticket.user_id,
-            text=f"{get_text('messages.admin_reply', lang=user_lang)}\n\n{text}",
-            reply_markup=ReplyKeyboardRemove()
-        )
-    except Exception as e:
-        logger.error(f"Failed to send message to user {ticket.user_id}: {e}")
+        try:
+            # Send answer to user in their language
+            await context.bot.send_message(
+                chat_id=ticket.user_id,
+                text=f"{get_text('messages.admin_reply', lang=user_lang)}\n\n{text}",
+                reply_markup=ReplyKeyboardRemove()
+            )
+        except Exception as e:
+            logger.error(f"Failed to send message to user {ticket.user_id}: {e}")
 
-    # Update ticket card
-    message_id = TICKET_CARD_MESSAGES.get(ticket_id)
-    await send_or_update_ticket_card(context, ticket_id, action="working", message_id=message_id)
+        # Update ticket card
+        message_id = TICKET_CARD_MESSAGES.get(ticket_id)
+        await send_or_update_ticket_card(context, ticket_id, action="working", message_id=message_id)
 
 
 async def media_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -507,29 +506,30 @@ async def media_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if state == "awaiting_reply":
         ticket_id = context.user_data.get("reply_ticket_id")
         if ticket_id:
-            # Add media to ticket
-            ticket = ticket_service.add_message(ticket_id, "support", f"[{media_type}]", ADMIN_ID)
-
-            if ticket:
-                # Clear state
-                context.user_data["state"] = None
-                context.user_data["reply_ticket_id"] = None
-
-                # Get admin language
-                admin_lang = get_admin_language()
-
-                # Confirm to admin
-                await update.message.reply_text(get_text("messages.answer_sent", lang=admin_lang), reply_markup=ReplyKeyboardRemove())
-
-                try:
-                    # Forward media to user
-                    await update.message.forward(chat_id=ticket.user_id)
-                except Exception as e:
-                    logger.error(f"Failed to forward media to user {ticket.user_id}: {e}")
-
-                # Update ticket card
-                message_id = TICKET_CARD_MESSAGES.get(ticket_id)
-                await send_or_update_ticket_card(context, ticket_id, action="working", message_id=message_id)
+            async with ticket_service.ticket_lock(ticket_id):
+                # Add media to ticket
+                ticket = ticket_service.add_message(ticket_id, "support", f"[{media_type}]", ADMIN_ID)
+
+                if ticket:
+                    # Clear state
+                    context.user_data["state"] = None
+                    context.user_data["reply_ticket_id"] = None
+
+                    # Get admin language
+                    admin_lang = get_admin_language()
+
+                    # Confirm to admin
+                    await update.message.reply_text(get_text("messages.answer_sent", lang=admin_lang), reply_markup=ReplyKeyboardRemove())
+
+                    try:
+                        # Forward media to user
+                        await update.message.forward(chat_id=ticket.user_id)
+                    except Exception as e:
+                        logger.error(f"Failed to forward media to user {ticket.user_id}: {e}")
+
+                    # Update ticket card
+                    message_id = TICKET_CARD_MESSAGES.get(ticket_id)
+                    await send_or_update_ticket_card(context, ticket_id, action="working", message_id=message_id)
         return
 
     # Handle media in active ticket
@@ -540,34 +540,35 @@ async def media_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
             await update.message.reply_text(get_text("messages.wait_for_admin_reply", lang=user_lang), reply_markup=ReplyKeyboardRemove())
             return
 
-        # Add media to ticket
-        ticket_service.add_message(active_ticket.id, "user", f"[{media_type}]")
+        async with ticket_service.ticket_lock(active_ticket.id):
+            # Add media to ticket
+            ticket_service.add_message(active_ticket.id, "user", f"[{media_type}]")
 
-        # Confirm to user
-        await update.message.reply_text(get_text("messages.message_sent", lang=user_lang), reply_markup=ReplyKeyboardRemove())
+            # Confirm to user
+            await update.message.reply_text(get_text("messages.message_sent", lang=user_lang), reply_markup=ReplyKeyboardRemove())
 
-        # Get admin language
-        admin_lang = get_admin_language()
+            # Get admin language
+            admin_lang = get_admin_language()
 
-        # Create button to open ticket
-        keyboard = InlineKeyboardMarkup([
-            [InlineKeyboardButton(f"📋 {get_text('search.button_open', lang=admin_lang)}", callback_data=f"ticket:{active_ticket.id}")]
-        ])
+            # Create button to open ticket
+            keyboard = InlineKeyboardMarkup([
+                [InlineKeyboardButton(f"📋 {get_text('search.button_open', lang=admin_lang)}", callback_data=f"ticket:{active_ticket.id}")]
+            ])
 
-        try:
-            # Send notification to admin
-            await context.bot.send_message(
-                chat_id=ADMIN_ID,
-                text=f"👤 @{user.username or 'unknown'} (ID: {user.id}):\n[{media_type}]",
-                reply_markup=keyboard
-            )
-            logger.info(f"Media notification sent to admin from user {user.id}")
-        except Exception as e:
-            logger.error(f"Failed to send media notification to admin: {e}")
+            try:
+                # Send notification to admin
+                await context.bot.send_message(
+                    chat_id=ADMIN_ID,
+                    text=f"👤 @{user.username or 'unknown'} (ID: {user.id}):\n[{media_type}]",
+                    reply_markup=keyboard
+                )
+                logger.info(f"Media notification sent to admin from user {user.id}")
+            except Exception as e:
+                logger.error(f"Failed to send media notification to admin: {e}")
 
-        # Update ticket card
-        message_id = TICKET_CARD_MESSAGES.get(active_ticket.id)
-        await send_or_update_ticket_card(context, active_ticket.id, action="message", message_id=message_id)
+            # Update ticket card
+            message_id = TICKET_CARD_MESSAGES.get(active_ticket.id)
+            await send_or_update_ticket_card(context, active_ticket.id, action="message", message_id=message_id)
 
 
 async def back_to_service_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
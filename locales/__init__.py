@@ -104,8 +104,7 @@ def get_user_locale(user_id: int) -> Optional[str]:
     # Then check data_manager for persistence
     try:
         from storage.data_manager import data_manager
-        user_data = data_manager.get_user_data(user_id)
-        locale = user_data.get("locale")
+        locale = data_manager.get_user_locale(user_id)
         if locale:
             # Cache in memory
             _user_locales[user_id] = locale
@@ -10,11 +10,11 @@ Telegram Support Bot with ticket system, admin panel, and backup functionality.
 import asyncio
 import logging
 from telegram import Update
-from telegram.ext import Application, CommandHandler, MessageHandler, CallbackQueryHandler, filters
+from telegram.ext import Application, CommandHandler, MessageHandler, CallbackQueryHandler, InlineQueryHandler, filters
 
 # Import configuration first
 from config import (
-    TOKEN, ADMIN_ID,
+    TOKEN, ADMIN_ID, CONCURRENT_UPDATES,
     post_init, post_shutdown,
     BOT_NAME, BOT_VERSION, BOT_BUILD_DATE
 )
@@ -33,6 +33,7 @@ from handlers.commands import (
     backup_command
 )
 from handlers.callbacks import callback_handler
+from handlers.inline import inline_query_handler
 from handlers.errors import error_handler
 
 logger = logging.getLogger(__name__)
@@ -47,6 +48,7 @@ def main():
         .token(TOKEN)
         .post_init(post_init)
         .post_shutdown(post_shutdown)
+        .concurrent_updates(CONCURRENT_UPDATES if CONCURRENT_UPDATES > 1 else False)
         .build()
     )
 
@@ -58,6 +60,9 @@ def main():
     # Add callback handler
     application.add_handler(CallbackQueryHandler(callback_handler))
 
+    # Add inline mode handler (ticket lookup for admin, inline mode enabled in @BotFather)
+    application.add_handler(InlineQueryHandler(inline_query_handler))
+
     # Add message handlers
     application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, text_message_handler))
     application.add_handler(MessageHandler(
@@ -25,8 +25,7 @@ class AlertService:
     def _load_admin_locale(self):
         """Load admin's locale"""
         try:
-            user_data = data_manager.get_user_data(ADMIN_ID)
-            admin_locale = user_data.get("locale", "ru")
+            admin_locale = data_manager.get_user_locale(ADMIN_ID) or "ru"
             set_locale(admin_locale)
         except Exception as e:
             logger.warning(f"Failed to load admin locale, using default: {e}")
@@ -205,5 +204,11 @@ class AlertService:
             _("alerts.ticket_auto_closed", ticket_id=ticket_id, hours=hours)
         )
 
+    async def send_data_recovery_alert(self, notes: list):
+        """Damaged storage recovered on startup notification"""
+        self._load_admin_locale()
+        details = "\n".join(f"• {note}" for note in notes)
+        await self.send_alert(_("alerts.data_recovered", details=details))
+
 # Global instance
 alert_service = AlertService()
@@ -148,7 +148,7 @@ class BackupService:
         with tarfile.open(backup_path, "w:gz") as tar:
             for filename in BACKUP_FILE_LIST:
                 file_path = os.path.join(DATA_DIR, filename)
-                if os.path.isfile(file_path):
+                if os.path.exists(file_path):
                     tar.add(file_path, arcname=filename)
                     files_added += 1
                     logger.debug(f"Added to backup: {filename}")
@@ -0,0 +1,134 @@
+"""
+Auto-close deadlines of tickets waiting for a user reply
+
+A ticket gets a deadline (last activity + AUTO_CLOSE_AFTER_HOURS) when
+support replies and loses it when the user answers or the ticket is
+closed. Deadlines are kept in a min-heap, so the earliest one is known
+at O(log N) cost per change, and the wake loop sleeps exactly until it.
+
+Changed or cancelled deadlines are not searched for in the heap: the
+current deadline of each ticket is kept in a dict, and heap entries that
+don't match it are dropped when they reach the top.
+"""
+
+import asyncio
+import heapq
+import logging
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from config import AUTO_CLOSE_AFTER_HOURS, TIMEZONE
+from storage.models import Ticket, ACTIVE_STATUSES
+
+logger = logging.getLogger(__name__)
+
+# Longest sleep between checks - guards against system clock changes
+MAX_SLEEP = 3600
+
+
+class DeadlineQueue:
+    """Ticket deadlines (epoch seconds), earliest first"""
+
+    def __init__(self, timeout_seconds: float):
+        self.timeout_seconds = timeout_seconds
+        self._heap: List[Tuple[float, str]] = []
+        self._deadlines: Dict[str, float] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self._deadlines)
+
+    def schedule(self, ticket_id: str, deadline: float):
+        """Set deadline of ticket (replaces previous one)"""
+        if self._deadlines.get(ticket_id) == deadline:
+            return
+        self._deadlines[ticket_id] = deadline
+        heapq.heappush(self._heap, (deadline, ticket_id))
+
+        if len(self._heap) > 2 * len(self._deadlines) + 64:
+            # Mostly stale entries - rebuild from current deadlines
+            self._heap = [(d, tid) for tid, d in self._deadlines.items()]
+            heapq.heapify(self._heap)
+
+        # New earliest deadline - wake loop to sleep for a shorter time
+        if self._wakeup is not None and self._heap[0] == (deadline, ticket_id):
+            self._wakeup.set()
+
+    def cancel(self, ticket_id: str):
+        """Drop deadline of ticket (its heap entry is discarded lazily)"""
+        self._deadlines.pop(ticket_id, None)
+
+    def track(self, ticket: Ticket):
+        """Schedule or cancel deadline from ticket state"""
+        if ticket.status not in ACTIVE_STATUSES or ticket.last_actor != "support":
+            self.cancel(ticket.id)
+            return
+        last_activity = ticket.last_activity_at or ticket.created_at
+        if last_activity.tzinfo is None:
+            last_activity = last_activity.replace(tzinfo=TIMEZONE)
+        self.schedule(ticket.id, last_activity.timestamp() + self.timeout_seconds)
+
+    def load(self, tickets: List[Ticket]):
+        """Build deadlines from open tickets (at startup)"""
+        self._deadlines = {}
+        self._heap = []
+        for ticket in tickets:
+            self.track(ticket)
+        logger.info(f"Auto-close deadlines loaded: {len(self)} tickets waiting for user reply")
+
+    def next_deadline(self) -> Optional[float]:
+        """Earliest current deadline (None if no ticket has one)"""
+        while self._heap and self._deadlines.get(self._heap[0][1]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now: float) -> List[str]:
+        """Remove and return tickets whose deadline has passed"""
+        due = []
+        while True:
+            deadline = self.next_deadline()
+            if deadline is None or deadline > now:
+                return due
+            _, ticket_id = heapq.heappop(self._heap)
+            del self._deadlines[ticket_id]
+            due.append(ticket_id)
+
+    async def _run(self, on_due: Callable[[List[str]], Awaitable[None]]):
+        """Sleep until next deadline (or until an earlier one is scheduled), then hand over due tickets"""
+        self._wakeup = asyncio.Event()
+        while True:
+            deadline = self.next_deadline()
+            timeout = MAX_SLEEP if deadline is None else min(MAX_SLEEP, max(0.0, deadline - time.time()))
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+                continue
+            except asyncio.TimeoutError:
+                pass
+
+            due = self.pop_due(time.time())
+            if due:
+                try:
+                    await on_due(due)
+                except Exception as e:
+                    logger.error(f"Failed to process due tickets {due}: {e}", exc_info=True)
+
+    def start(self, on_due: Callable[[List[str]], Awaitable[None]]):
+        """Start wake loop calling on_due(ticket_ids) as deadlines pass"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(on_due))
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        self._wakeup = None
+
+
+# Global instance
+auto_close_deadlines = DeadlineQueue(AUTO_CLOSE_AFTER_HOURS * 3600)
@@ -0,0 +1,315 @@
+"""
+Full-text ticket search for admin
+
+Inverted index over message text, username, user id and ticket id:
+each term maps to {ticket_id: term frequency}. Results are ranked with
+BM25, so tickets where rare query words occur often come first.
+
+Words are lowercased, ё folded into е and common Russian / English
+endings stripped, so "заказа" finds "заказ" and "payments" finds "payment".
+
+UserIndex finds users by partial or misspelled @username / user id.
+
+Both indexes are updated as tickets are created and messages added, and
+saved to SEARCH_INDEX_FILE / USER_INDEX_FILE (.json or .msgpack, as
+DATA_FORMAT) every SEARCH_INDEX_SAVE_INTERVAL seconds and on shutdown.
+At startup they are loaded from there and only what was added since the
+last save is indexed.
+"""
+
+import asyncio
+import logging
+import math
+import os
+import re
+from typing import Dict, List, Optional
+from config import SEARCH_INDEX_FILE, USER_INDEX_FILE, DATA_FORMAT
+from storage import serializers
+from storage.data_manager import data_manager
+from storage.models import Ticket
+from storage.shards import write_file_atomic
+from storage.trigram import TrigramIndex
+
+logger = logging.getLogger(__name__)
+
+_WORD_RE = re.compile(r"\w+")
+_CYRILLIC_RE = re.compile(r"[а-я]")
+
+# Longest endings first; a stem keeps at least MIN_STEM letters
+_RU_ENDINGS = sorted((
+    "ами", "ями", "ого", "его", "ому", "ему", "ыми", "ими", "ать", "ять", "ить", "еть",
+    "ешь", "ишь", "ете", "ите", "ая", "яя", "ое", "ее", "ые", "ие", "ой", "ей", "ий", "ый",
+    "ом", "ем", "ам", "ям", "ах", "ях", "ов", "ев", "ую", "юю", "ет", "ит", "ут", "ют",
+    "ат", "ят", "а", "я", "о", "е", "ы", "и", "у", "ю", "ь", "й"
+), key=len, reverse=True)
+_EN_ENDINGS = ("ing", "ies", "ed", "es", "ly", "s")
+MIN_STEM = 3
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+
+def _stem(word: str) -> str:
+    """Strip common inflection ending from Russian or English word"""
+    if word.isdigit():
+        return word
+    endings = _RU_ENDINGS if _CYRILLIC_RE.search(word) else _EN_ENDINGS
+    for ending in endings:
+        if word.endswith(ending) and len(word) - len(ending) >= MIN_STEM:
+            return word[:-len(ending)]
+    return word
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Search terms of text"""
+    if not text:
+        return []
+    words = _WORD_RE.findall(text.lower().replace("ё", "е"))
+    return [_stem(word) for word in words if word != "_"]
+
+
+def _ticket_terms(ticket: Ticket) -> List[str]:
+    """Terms of ticket itself: id and its number, user id, username"""
+    terms = [ticket.id.lower(), str(ticket.user_id)]
+    parts = ticket.id.lower().split("-")
+    if len(parts) == 3:
+        # "T-20251110-0042" is found by "20251110", "0042" and "42"
+        terms += [parts[1], parts[2], parts[2].lstrip("0") or "0"]
+    if ticket.username:
+        terms += [ticket.username.lower()] + tokenize(ticket.username)
+    return terms
+
+
+def _index_file(base: str, fmt: str) -> str:
+    """Index file path with extension of its format"""
+    return base + serializers.EXTENSIONS[fmt]
+
+
+class SearchIndex:
+    """Inverted index of tickets with BM25 ranking"""
+
+    def __init__(self, path: str = SEARCH_INDEX_FILE):
+        self.data_format = serializers.available_format(DATA_FORMAT)
+        self.path = _index_file(path, self.data_format)
+        self._clear()
+
+    def _clear(self):
+        self._postings: Dict[str, Dict[str, int]] = {}
+        # Distinct terms of each ticket, so it can be removed without scanning postings
+        self._terms: Dict[str, List[str]] = {}
+        # Number of terms per ticket (document length for BM25)
+        self._lengths: Dict[str, int] = {}
+        # Number of messages of each ticket already indexed
+        self._indexed: Dict[str, int] = {}
+        self._total_length = 0
+        self._dirty = False
+
+    def __len__(self) -> int:
+        return len(self._lengths)
+
+    def _add_terms(self, ticket_id: str, terms: List[str]):
+        ticket_terms = self._terms.setdefault(ticket_id, [])
+        for term in terms:
+            postings = self._postings.setdefault(term, {})
+            if ticket_id not in postings:
+                ticket_terms.append(term)
+            postings[ticket_id] = postings.get(ticket_id, 0) + 1
+        self._lengths[ticket_id] = self._lengths.get(ticket_id, 0) + len(terms)
+        self._total_length += len(terms)
+        self._dirty = True
+
+    def index_ticket(self, ticket: Ticket):
+        """Index ticket and its messages not indexed yet (history is not decoded)"""
+        done = self._indexed.get(ticket.id)
+        if done is None:
+            self._add_terms(ticket.id, _ticket_terms(ticket))
+            self._indexed[ticket.id] = done = 0
+        texts = ticket.message_texts(done)
+        if not texts:
+            return
+        terms = []
+        for text in texts:
+            terms += tokenize(text)
+        self._add_terms(ticket.id, terms)
+        self._indexed[ticket.id] = done + len(texts)
+
+    def remove_ticket(self, ticket_id: str):
+        """Drop ticket from index (e.g. it was deleted from storage)"""
+        if ticket_id not in self._lengths:
+            return
+        for term in self._terms.pop(ticket_id, ()):
+            del self._postings[term][ticket_id]
+            if not self._postings[term]:
+                del self._postings[term]
+        self._total_length -= self._lengths.pop(ticket_id)
+        self._indexed.pop(ticket_id, None)
+        self._dirty = True
+
+    def search(self, query: str) -> List[str]:
+        """Ticket ids matching any query term, best first (newest first on ties)"""
+        terms = set(tokenize(query))
+        if query.strip():
+            # Whole query as typed, e.g. full ticket id or username
+            terms.add(query.strip().lower().lstrip("#@"))
+        if not terms or not self._lengths:
+            return []
+
+        count = len(self._lengths)
+        avg_length = self._total_length / count or 1
+        scores: Dict[str, float] = {}
+        for term in terms:
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for ticket_id, tf in postings.items():
+                norm = K1 * (1 - B + B * self._lengths[ticket_id] / avg_length)
+                scores[ticket_id] = scores.get(ticket_id, 0.0) + idf * tf * (K1 + 1) / (tf + norm)
+
+        return sorted(scores, key=lambda tid: (scores[tid], tid), reverse=True)
+
+    # ========== PERSISTENCE ==========
+
+    def load(self):
+        """Load saved index, then index what changed in storage since it was saved"""
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, "rb") as f:
+                    data = serializers.loads(f.read())
+                self._postings = data["postings"]
+                self._lengths = data["lengths"]
+                self._indexed = data["indexed"]
+                self._total_length = sum(self._lengths.values())
+                for term, postings in self._postings.items():
+                    for ticket_id in postings:
+                        self._terms.setdefault(ticket_id, []).append(term)
+            except Exception as e:
+                logger.error(f"Failed to load search index, rebuilding: {e}")
+                self._clear()
+
+        loaded = len(self._lengths)
+        # Counts come without reading histories - only new or grown tickets are fetched
+        for ticket_id, count in data_manager.get_message_counts().items():
+            if self._indexed.get(ticket_id, -1) < count:
+                ticket = data_manager.get_ticket(ticket_id)
+                if ticket is not None:
+                    self.index_ticket(ticket)
+        logger.info(f"Search index ready: {len(self)} tickets ({len(self) - loaded} indexed at startup)")
+
+    def _copy(self) -> dict:
+        """Shallow copy of index state, safe to encode while the index changes"""
+        return {
+            "postings": {term: dict(postings) for term, postings in self._postings.items()},
+            "lengths": dict(self._lengths),
+            "indexed": dict(self._indexed)
+        }
+
+    def _write(self, data: dict):
+        write_file_atomic(self.path, serializers.dumps(data, self.data_format))
+
+    async def save_async(self):
+        """Copy index in event loop, then encode and write it in thread pool"""
+        if not self._dirty:
+            return
+        data = self._copy()
+        self._dirty = False
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, self._write, data)
+        except Exception as e:
+            self._dirty = True
+            logger.error(f"Failed to save search index: {e}")
+
+
+class UserIndex:
+    """
+    Fuzzy lookup of users who wrote tickets, by @username or user id
+
+    Only users and their latest username are saved; the trigram index over
+    them is small (one key per username and per user id) and rebuilt at load.
+    """
+
+    def __init__(self, path: str = USER_INDEX_FILE):
+        self.data_format = serializers.available_format(DATA_FORMAT)
+        self.path = _index_file(path, self.data_format)
+        self._clear()
+
+    def _clear(self):
+        self._index = TrigramIndex()
+        # Latest known username of each user (None if never had one)
+        self._usernames: Dict[int, Optional[str]] = {}
+        # Newest ticket whose user is indexed
+        self._last_ticket: Optional[str] = None
+        self._dirty = False
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def add(self, user_id: int, username: Optional[str] = None):
+        self._index.add(str(user_id), user_id)
+        if username:
+            self._index.add(username.lower(), user_id)
+        if username or user_id not in self._usernames:
+            self._usernames[user_id] = username
+        self._dirty = True
+
+    def add_ticket(self, ticket_id: str, user_id: int, username: Optional[str] = None):
+        """Index user of ticket"""
+        self.add(user_id, username)
+        if self._last_ticket is None or ticket_id > self._last_ticket:
+            self._last_ticket = ticket_id
+
+    def username(self, user_id: int) -> Optional[str]:
+        return self._usernames.get(user_id)
+
+    def load(self):
+        """Load saved index, then index users of tickets created since it was saved"""
+        self._clear()
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, "rb") as f:
+                    data = serializers.loads(f.read())
+                for user_id, username in data["users"]:
+                    self.add(user_id, username)
+                self._last_ticket = data["last_ticket"]
+            except Exception as e:
+                logger.error(f"Failed to load user index, rebuilding: {e}")
+                self._clear()
+        self._dirty = False
+
+        added = data_manager.get_ticket_users(self._last_ticket)
+        for ticket_id, user_id, username in added:
+            self.add_ticket(ticket_id, user_id, username)
+        logger.info(f"User index ready: {len(self._usernames)} users ({len(added)} tickets indexed at startup)")
+
+    def _write(self, data: dict):
+        write_file_atomic(self.path, serializers.dumps(data, self.data_format))
+
+    async def save_async(self):
+        """Copy user list in event loop, then encode and write it in thread pool"""
+        if not self._dirty:
+            return
+        data = {"users": list(self._usernames.items()), "last_ticket": self._last_ticket}
+        self._dirty = False
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, self._write, data)
+        except Exception as e:
+            self._dirty = True
+            logger.error(f"Failed to save user index: {e}")
+
+    def search(self, query: str, limit: int = 5) -> List[int]:
+        """User ids whose username or id matches query, best first"""
+        query = query.strip().lower().lstrip("@")
+        found: List[int] = []
+        for key, _ in self._index.search(query):
+            for user_id in sorted(self._index.values(key)):
+                if user_id not in found:
+                    found.append(user_id)
+            if len(found) >= limit:
+                break
+        return found[:limit]
+
+
+# Global instances
+search_index = SearchIndex()
+user_index = UserIndex()
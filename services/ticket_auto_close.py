@@ -4,27 +4,46 @@ Ticket auto-close service
 
 Automatically closes inactive tickets after configured timeout.
 Only closes tickets where admin sent last message and user didn't reply.
+Tickets are closed when their deadline in services.deadlines passes,
+without scanning all open tickets.
 """
 
 import logging
+import time
 from datetime import datetime, timedelta
+from typing import List
 from config import AUTO_CLOSE_AFTER_HOURS, TIMEZONE, ADMIN_ID
 from storage.data_manager import data_manager
+from storage.models import TicketConflictError
+from services.deadlines import auto_close_deadlines
+from services.tickets import ticket_service
 from services.alerts import alert_service
 from locales import _, set_locale
 
 logger = logging.getLogger(__name__)
 
+# Delay before retrying a due ticket some handler is working with
+LOCKED_RETRY_SECONDS = 60
 
-async def auto_close_inactive_tickets():
+
+def start_auto_close():
+    """Load deadlines of open tickets and start closing them as they pass"""
+    auto_close_deadlines.load(data_manager.get_active_tickets())
+    auto_close_deadlines.start(auto_close_inactive_tickets)
+
+
+async def auto_close_inactive_tickets(ticket_ids: List[str]):
     """
-    Check and automatically close inactive tickets
+    Automatically close tickets whose auto-close deadline has passed
 
     Closes tickets only when:
     1. Last actor was admin/support
     2. No user response after AUTO_CLOSE_AFTER_HOURS hours
     3. Ticket status is 'new' or 'working'
 
+    Conditions are checked again on the stored ticket; tickets that are
+    not due after all get their deadline recalculated.
+
     Sends notifications to admin and users about auto-closed tickets.
     """
     try:
@@ -32,58 +51,90 @@ async def auto_close_inactive_tickets():
         threshold = now - timedelta(hours=AUTO_CLOSE_AFTER_HOURS)
         closed_tickets = []
 
-        # Get all open tickets (new or working status)
-        all_tickets = data_manager.get_all_tickets()
-        open_tickets = [t for t in all_tickets if t.status in ["new", "working"]]
-
-        logger.debug(f"Checking {len(open_tickets)} open tickets for auto-close")
-
-        for ticket in open_tickets:
-            # Check if last actor was support (admin replied last)
-            if ticket.last_actor != "support":
-                logger.debug(
-                    f"Ticket {ticket.id} skipped: last actor was '{ticket.last_actor}', "
-                    f"not 'support' (waiting for user reply)"
-                )
-                continue
-
-            # Get last activity time
-            last_activity = ticket.last_activity_at
-
-            if not last_activity:
-                # Fallback to creation time if no last_activity
-                last_activity = ticket.created_at
-                logger.warning(
-                    f"Ticket {ticket.id} has no last_activity_at, using created_at"
-                )
-
-            # Make timezone-aware if needed
-            if last_activity.tzinfo is None:
-                last_activity = last_activity.replace(tzinfo=TIMEZONE)
-
-            # Check if ticket should be auto-closed
-            # Close only if admin replied and user didn't respond for N hours
-            if last_activity < threshold:
-                hours_inactive = (now - last_activity).total_seconds() / 3600
-
-                logger.info(
-                    f"Auto-closing ticket {ticket.id} "
-                    f"(admin replied, no user response for {hours_inactive:.1f} hours, "
-                    f"last activity: {last_activity.strftime('%Y-%m-%d %H:%M:%S')})"
-                )
-
-                # Close the ticket
-                ticket.status = "done"
-                ticket.last_activity_at = now
-
-                # Save ticket
-                data_manager.update_ticket(ticket)
-
-                closed_tickets.append({
-                    'id': ticket.id,
-                    'user_id': ticket.user_id,
-                    'hours_inactive': hours_inactive
-                })
+        logger.debug(f"Checking {len(ticket_ids)} due tickets for auto-close")
+
+        # All closes are persisted together (one save / journal record)
+        try:
+            with data_manager.batch():
+                for ticket_id in ticket_ids:
+                    ticket = data_manager.get_ticket(ticket_id)
+                    if not ticket:
+                        continue
+
+                    # A handler is working with this ticket - retry shortly
+                    if ticket_service.is_ticket_locked(ticket.id):
+                        logger.debug(f"Ticket {ticket.id} skipped: in use by a handler")
+                        auto_close_deadlines.schedule(ticket.id, time.time() + LOCKED_RETRY_SECONDS)
+                        continue
+
+                    if ticket.status not in ("new", "working"):
+                        continue
+
+                    # Check if last actor was support (admin replied last)
+                    if ticket.last_actor != "support":
+                        logger.debug(
+                            f"Ticket {ticket.id} skipped: last actor was '{ticket.last_actor}', "
+                            f"not 'support' (waiting for user reply)"
+                        )
+                        continue
+
+                    # Get last activity time
+                    last_activity = ticket.last_activity_at
+
+                    if not last_activity:
+                        # Fallback to creation time if no last_activity
+                        last_activity = ticket.created_at
+                        logger.warning(
+                            f"Ticket {ticket.id} has no last_activity_at, using created_at"
+                        )
+
+                    # Make timezone-aware if needed
+                    if last_activity.tzinfo is None:
+                        last_activity = last_activity.replace(tzinfo=TIMEZONE)
+
+                    # Check if ticket should be auto-closed
+                    # Close only if admin replied and user didn't respond for N hours
+                    if last_activity > threshold:
+                        # Activity after deadline was set - wait for the new one
+                        auto_close_deadlines.track(ticket)
+                        continue
+
+                    hours_inactive = (now - last_activity).total_seconds() / 3600
+
+                    logger.info(
+                        f"Auto-closing ticket {ticket.id} "
+                        f"(admin replied, no user response for {hours_inactive:.1f} hours, "
+                        f"last activity: {last_activity.strftime('%Y-%m-%d %H:%M:%S')})"
+                    )
+
+                    # Close a copy, so the stored ticket stays as it is if the save is rejected
+                    version = ticket.version
+                    ticket = ticket.copy()
+                    ticket.status = "done"
+                    ticket.last_activity_at = now
+
+                    # Save ticket (fails if it changed since it was read)
+                    try:
+                        data_manager.update_ticket(ticket, expected_version=version)
+                    except TicketConflictError as e:
+                        logger.warning(f"Ticket {ticket.id} not auto-closed: {e}")
+                        current = data_manager.get_ticket(ticket.id)
+                        if current:
+                            auto_close_deadlines.track(current)
+                        continue
+
+                    closed_tickets.append({
+                        'id': ticket.id,
+                        'user_id': ticket.user_id,
+                        'hours_inactive': hours_inactive
+                    })
+        except Exception:
+            # Rolled back: nothing was closed, but due tickets were taken off the queue
+            for ticket_id in ticket_ids:
+                current = data_manager.get_ticket(ticket_id)
+                if current:
+                    auto_close_deadlines.track(current)
+            raise
 
         # Log results
         if closed_tickets:
@@ -93,13 +144,11 @@ async def auto_close_inactive_tickets():
             for ticket_info in closed_tickets:
                 # Send notification to admin (as ticket card with action)
                 try:
-                    from services.tickets import ticket_service
                     from utils.formatters import format_ticket_card
                     from telegram import InlineKeyboardButton, InlineKeyboardMarkup
 
                     # Load admin locale for ticket card
-                    user_data = data_manager.get_user_data(ADMIN_ID)
-                    admin_locale = user_data.get("locale", "ru")
+                    admin_locale = data_manager.get_user_locale(ADMIN_ID) or "ru"
                     set_locale(admin_locale)
 
                     ticket = ticket_service.get_ticket(ticket_info['id'])
@@ -128,8 +177,7 @@ async def auto_close_inactive_tickets():
                 # Send notification to user
                 try:
                     # Load user's locale
-                    user_data = data_manager.get_user_data(ticket_info['user_id'])
-                    user_locale = user_data.get("locale", "ru")
+                    user_locale = data_manager.get_user_locale(ticket_info['user_id']) or "ru"
 
                     set_locale(user_locale)
 
@@ -1,32 +1,68 @@
+import asyncio
 import logging
+import weakref
 from datetime import datetime
-from typing import Optional, List
-from storage.models import Ticket, Message
+from typing import Callable, Optional, List
+from storage.models import Ticket, Message, TicketConflictError
 from storage.data_manager import data_manager
+from services.search import search_index, user_index
+from services.deadlines import auto_close_deadlines
 from config import TIMEZONE
 
 logger = logging.getLogger(__name__)
 
+# Attempts of a read-modify-write before the conflict is reported
+UPDATE_RETRIES = 3
+
 class TicketService:
+    def __init__(self):
+        # Locks live only while some handler holds or awaits them
+        self._locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+
+    def ticket_lock(self, ticket_id: str) -> asyncio.Lock:
+        """Lock serializing handlers that work with one ticket across awaits"""
+        lock = self._locks.get(ticket_id)
+        if lock is None:
+            lock = asyncio.Lock()
+            self._locks[ticket_id] = lock
+        return lock
+
+    def is_ticket_locked(self, ticket_id: str) -> bool:
+        """Check if some handler is working with ticket right now"""
+        lock = self._locks.get(ticket_id)
+        return lock is not None and lock.locked()
+
+    def _modify_ticket(self, ticket_id: str, change: Callable[[Ticket], None]) -> Optional[Ticket]:
+        """
+        Apply change to a copy of ticket and save it with version check, retrying on conflict
+
+        The stored ticket is left as it is if the save is rejected.
+        """
+        for attempt in range(1, UPDATE_RETRIES + 1):
+            stored = data_manager.get_ticket(ticket_id)
+            if not stored:
+                logger.error(f"Ticket {ticket_id} not found")
+                return None
+
+            ticket = stored.copy()
+            change(ticket)
+            try:
+                data_manager.update_ticket(ticket, expected_version=stored.version)
+                return ticket
+            except TicketConflictError as e:
+                logger.warning(f"Ticket {ticket_id} changed concurrently (attempt {attempt}/{UPDATE_RETRIES}): {e}")
+
+        raise TicketConflictError(f"Ticket {ticket_id} kept changing, update dropped after {UPDATE_RETRIES} attempts")
+
     def generate_ticket_id(self) -> str:
         """Generate unique ticket ID"""
         now = datetime.now(TIMEZONE)
         date_part = now.strftime("%Y%m%d")
 
-        # Find maximum ticket number for today
-        prefix = f"T-{date_part}-"
-        existing = [
-            t.id for t in data_manager.get_all_tickets()
-            if t.id.startswith(prefix)
-        ]
-
-        if not existing:
-            num = 1
-        else:
-            nums = [int(tid.split("-")[-1]) for tid in existing]
-            num = max(nums) + 1
+        # Per-day counter is kept by storage and recovered from existing IDs on load
+        num = data_manager.next_ticket_number(date_part)
 
-        return f"{prefix}{num:04d}"
+        return f"T-{date_part}-{num:04d}"
 
     def create_ticket(
         self,
@@ -52,6 +88,9 @@ class TicketService:
         )
 
         data_manager.create_ticket(ticket)
+        # Indexes follow storage only once the change is committed (see DataManager.on_commit)
+        data_manager.on_commit(lambda: search_index.index_ticket(ticket))
+        data_manager.on_commit(lambda: user_index.add_ticket(ticket.id, user_id, username))
         logger.info(f"Created ticket {ticket_id} for user {user_id}")
 
         return ticket
@@ -70,108 +109,99 @@ class TicketService:
         admin_id: Optional[int] = None
     ) -> Optional[Ticket]:
         """Add message to ticket and update last_actor"""
-        ticket = data_manager.get_ticket(ticket_id)
+        def change(ticket: Ticket):
+            now = datetime.now(TIMEZONE)
+            message = Message(sender=sender, text=text, at=now)
+            ticket.messages.append(message)
+            ticket.last_activity_at = now
+            ticket.last_actor = sender  # Update last_actor to track conversation flow
+
+            # If admin replies for first time, set response time and assign ticket
+            if sender == "support" and ticket.first_response_at is None:
+                ticket.first_response_at = now
+                if admin_id:
+                    ticket.assigned = admin_id
+
+        ticket = self._modify_ticket(ticket_id, change)
         if not ticket:
-            logger.error(f"Ticket {ticket_id} not found")
             return None
-
-        now = datetime.now(TIMEZONE)
-        message = Message(sender=sender, text=text, at=now)
-        ticket.messages.append(message)
-        ticket.last_activity_at = now
-        ticket.last_actor = sender  # Update last_actor to track conversation flow
-
-        # If admin replies for first time, set response time and assign ticket
-        if sender == "support" and ticket.first_response_at is None:
-            ticket.first_response_at = now
-            if admin_id:
-                ticket.assigned = admin_id
-
-        # Save updated ticket
-        data_manager.update_ticket(ticket)
+        data_manager.on_commit(lambda: search_index.index_ticket(ticket))
+        # Support reply starts auto-close countdown, user reply stops it
+        data_manager.on_commit(lambda: auto_close_deadlines.track(ticket))
         logger.info(f"✅ Added {sender} message to ticket {ticket_id}, last_actor={sender}")
 
         return ticket
 
     def take_ticket(self, ticket_id: str, admin_id: int) -> Optional[Ticket]:
         """Take ticket in progress"""
-        ticket = data_manager.get_ticket(ticket_id)
+        def change(ticket: Ticket):
+            ticket.status = "working"
+            ticket.assigned = admin_id
+            ticket.last_activity_at = datetime.now(TIMEZONE)
+
+        ticket = self._modify_ticket(ticket_id, change)
         if not ticket:
-            logger.error(f"Ticket {ticket_id} not found")
             return None
-
-        ticket.status = "working"
-        ticket.assigned = admin_id
-        ticket.last_activity_at = datetime.now(TIMEZONE)
-
-        data_manager.update_ticket(ticket)
+        data_manager.on_commit(lambda: auto_close_deadlines.track(ticket))
         logger.info(f"Ticket {ticket_id} taken by admin {admin_id}")
 
         return ticket
 
     def close_ticket(self, ticket_id: str) -> Optional[Ticket]:
         """Close ticket"""
-        ticket = data_manager.get_ticket(ticket_id)
+        def change(ticket: Ticket):
+            ticket.status = "done"
+            ticket.last_activity_at = datetime.now(TIMEZONE)
+
+        ticket = self._modify_ticket(ticket_id, change)
         if not ticket:
-            logger.error(f"Ticket {ticket_id} not found")
             return None
-
-        ticket.status = "done"
-        ticket.last_activity_at = datetime.now(TIMEZONE)
-
-        data_manager.update_ticket(ticket)
+        data_manager.on_commit(lambda: auto_close_deadlines.cancel(ticket_id))
         logger.info(f"Ticket {ticket_id} closed")
 
         return ticket
 
     def rate_ticket(self, ticket_id: str, rating: str) -> Optional[Ticket]:
         """Rate ticket by user"""
-        ticket = data_manager.get_ticket(ticket_id)
+        def change(ticket: Ticket):
+            ticket.rated = True
+            ticket.rating = rating
+
+        ticket = self._modify_ticket(ticket_id, change)
         if not ticket:
-            logger.error(f"Ticket {ticket_id} not found")
             return None
-
-        ticket.rated = True
-        ticket.rating = rating
-
-        data_manager.update_ticket(ticket)
         logger.info(f"Ticket {ticket_id} rated: {rating}")
 
         return ticket
 
     def get_active_tickets(self) -> List[Ticket]:
         """Get all active tickets (new or working)"""
-        return [
-            t for t in data_manager.get_all_tickets()
-            if t.status in ["new", "working"]
-        ]
+        return data_manager.get_active_tickets()
 
     def get_user_active_ticket(self, user_id: int) -> Optional[Ticket]:
         """Get user's most recent active ticket (new or working status)"""
-        # Get all active tickets for user
-        tickets = [
-            t for t in data_manager.get_all_tickets()
-            if t.user_id == user_id and t.status in ["new", "working"]
-        ]
-        
-        if not tickets:
-            return None
-        
-        # Return the most recently created ticket
-        # This ensures user works with the latest ticket, not old ones
-        most_recent = max(tickets, key=lambda t: t.created_at)
-        logger.debug(f"🔍 User {user_id} has {len(tickets)} active ticket(s), returning: {most_recent.id}")
-        
-        return most_recent
+        # Most recently created active ticket is indexed by storage,
+        # so user always works with the latest ticket, not old ones
+        ticket = data_manager.get_user_active_ticket(user_id)
+        if ticket:
+            logger.debug(f"🔍 User {user_id} active ticket: {ticket.id}")
+
+        return ticket
 
     def clear_active_tickets(self) -> int:
         """Close all active tickets"""
-        count = 0
-        for ticket in self.get_active_tickets():
-            ticket.status = "done"
-            data_manager.update_ticket(ticket)
-            count += 1
-
+        closed = []
+        with data_manager.batch():
+            for stored in self.get_active_tickets():
+                ticket = stored.copy()
+                ticket.status = "done"
+                data_manager.update_ticket(ticket, expected_version=stored.version)
+                closed.append(ticket.id)
+
+        # Reached only if the batch was committed
+        for ticket_id in closed:
+            auto_close_deadlines.cancel(ticket_id)
+        count = len(closed)
         logger.info(f"Cleared {count} active tickets")
         return count
 
@@ -1,4 +1,4 @@
 from .data_manager import data_manager
-from .models import Ticket, Message
+from .models import Ticket, Message, TicketConflictError
 
-__all__ = ['data_manager', 'Ticket', 'Message']
+__all__ = ['data_manager', 'Ticket', 'Message', 'TicketConflictError']
@@ -0,0 +1,149 @@
+"""
+Cold archive tier for closed tickets
+
+Tickets closed long ago are moved out of the in-memory working set into
+gzip-compressed, append-only segment files, one per creation month
+(archive/tickets-YYYYMM.jsonl.gz). Each archive run appends a new gzip
+member, so existing data is never rewritten.
+
+A small index (archive/index.json) lists archived ticket ids for search
+and stats; ticket bodies are read from the segment on demand.
+"""
+
+import gzip
+import json
+import os
+import logging
+import threading
+from typing import Dict, Iterable, Iterator, List, Optional
+from storage.models import Ticket
+
+logger = logging.getLogger(__name__)
+
+
+class ArchiveStore:
+    """Compressed segment files with archived tickets"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.index_path = os.path.join(directory, "index.json")
+        # ticket_id -> [user_id, created_at]; replaced as a whole on change,
+        # so readers on the event loop never see it mid-update
+        self.index: Dict[str, list] = {}
+        # append() runs in a worker thread, forget() on the loop: one writer at a time
+        self._index_lock = threading.Lock()
+        self.load_index()
+
+    def load_index(self):
+        """Load archived ticket ids"""
+        if not os.path.exists(self.index_path):
+            return
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                self.index = json.load(f)
+            logger.info(f"Archive index loaded: {len(self.index)} tickets")
+        except Exception as e:
+            logger.error(f"Error loading archive index: {e}", exc_info=True)
+            self.index = {}
+
+    def _save_index(self, index: Dict[str, list]):
+        """Atomically rewrite archive index (caller holds _index_lock)"""
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(index, f, separators=(",", ":"))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.index_path)
+
+    def _segment_path(self, ticket_id: str) -> str:
+        """Segment file for ticket, by creation month from ID (T-YYYYMMDD-NNNN)"""
+        parts = ticket_id.split("-")
+        month = parts[1][:6] if len(parts) == 3 and parts[1].isdigit() else "other"
+        return os.path.join(self.directory, f"tickets-{month}.jsonl.gz")
+
+    def __contains__(self, ticket_id: str) -> bool:
+        return ticket_id in self.index
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def ticket_ids(self) -> Iterable[str]:
+        """All archived ticket ids"""
+        return self.index.keys()
+
+    def user_ticket_ids(self, user_id: int) -> List[str]:
+        """Archived ticket ids of user (scans the index, no segment is read)"""
+        return [ticket_id for ticket_id, (owner, _) in self.index.items() if owner == user_id]
+
+    def append(self, tickets: List[dict]):
+        """Write ticket dicts to their segments and register them (blocking I/O)"""
+        os.makedirs(self.directory, exist_ok=True)
+
+        by_segment: Dict[str, List[dict]] = {}
+        for data in tickets:
+            by_segment.setdefault(self._segment_path(data["id"]), []).append(data)
+
+        for path, items in by_segment.items():
+            lines = "".join(
+                json.dumps(item, ensure_ascii=False, separators=(",", ":")) + "\n" for item in items
+            )
+            # Appending in "ab" mode adds a new gzip member - readers see one stream
+            with gzip.open(path, "ab") as f:
+                f.write(lines.encode("utf-8"))
+            with open(path, "rb") as f:
+                os.fsync(f.fileno())
+
+        with self._index_lock:
+            index = dict(self.index)
+            for data in tickets:
+                index[data["id"]] = [data["user_id"], data["created_at"]]
+            self._save_index(index)
+            self.index = index
+
+    def forget(self, ticket_ids: Iterable[str]):
+        """Unregister tickets that went back to the working set"""
+        with self._index_lock:
+            index = dict(self.index)
+            changed = False
+            for ticket_id in ticket_ids:
+                if index.pop(ticket_id, None) is not None:
+                    changed = True
+            if changed:
+                self._save_index(index)
+                self.index = index
+
+    def get(self, ticket_id: str) -> Optional[Ticket]:
+        """Load archived ticket from its segment"""
+        if ticket_id not in self.index:
+            return None
+
+        path = self._segment_path(ticket_id)
+        found = None
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                for line in f:
+                    # Cheap prefilter before parsing; later copies supersede earlier ones
+                    if ticket_id not in line:
+                        continue
+                    data = json.loads(line)
+                    if data.get("id") == ticket_id:
+                        found = data
+        except Exception as e:
+            logger.error(f"Error reading archive segment {path}: {e}", exc_info=True)
+            return None
+
+        return Ticket.from_dict(found) if found else None
+
+    def iter_tickets(self) -> Iterator[Ticket]:
+        """Read every archived ticket, one segment at a time"""
+        segments = sorted({self._segment_path(ticket_id) for ticket_id in self.index})
+        for path in segments:
+            latest = {}
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                for line in f:
+                    data = json.loads(line)
+                    if data["id"] in self.index:
+                        latest[data["id"]] = data
+            for data in latest.values():
+                yield Ticket.from_dict(data)
+
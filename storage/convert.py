@@ -0,0 +1,57 @@
+"""
+One-shot conversion of data.json to another DATA_FORMAT
+
+Usage (with the bot stopped):
+    python -m storage.convert msgpack
+
+Loads the current data (any format, journal included) and writes a fresh
+snapshot in the requested format. Set DATA_FORMAT to the same value
+afterwards, otherwise the next save converts the file back.
+"""
+
+import os
+import sys
+import time
+from storage import serializers
+from storage.data_manager import data_manager, DataManager
+from config import DATA_FILE, SHARDS_DIR
+
+
+def _stored_size() -> int:
+    """Size of data.json or of all shard files"""
+    if data_manager.sharded:
+        if not os.path.isdir(SHARDS_DIR):
+            return 0
+        return sum(os.path.getsize(os.path.join(SHARDS_DIR, name)) for name in os.listdir(SHARDS_DIR))
+    return os.path.getsize(DATA_FILE) if os.path.exists(DATA_FILE) else 0
+
+
+def convert(fmt: str):
+    """Rewrite data file in given format and report size and timings"""
+    if not isinstance(data_manager, DataManager):
+        raise SystemExit("Conversion applies to STORAGE_BACKEND=json only")
+    if serializers.available_format(fmt) != fmt:
+        raise SystemExit(f"Library for format '{fmt}' is not installed")
+
+    size_before = _stored_size()
+
+    data_manager.data_format = fmt
+    data_manager._mark_all_dirty()
+    started = time.perf_counter()
+    data_manager.save()
+    save_time = time.perf_counter() - started
+
+    started = time.perf_counter()
+    DataManager()
+    load_time = time.perf_counter() - started
+
+    print(
+        f"{SHARDS_DIR if data_manager.sharded else DATA_FILE}: {size_before} -> {_stored_size()} bytes ({fmt}), "
+        f"save {save_time:.3f}s, load {load_time:.3f}s"
+    )
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2 or sys.argv[1] not in serializers.FORMATS:
+        raise SystemExit(f"Usage: python -m storage.convert {{{'|'.join(serializers.FORMATS)}}}")
+    convert(sys.argv[1])
@@ -1,110 +1,970 @@
-import json
+import hashlib
 import os
+import asyncio
 import logging
-from typing import Dict, List, Optional
-from datetime import datetime
-from storage.models import Ticket, Message
-from config import DATA_FILE
+import threading
+from contextlib import contextmanager
+from types import MappingProxyType
+from typing import Callable, Dict, Iterator, List, Mapping, Optional
+from datetime import datetime, timedelta
+from storage.models import Ticket, Message, TicketConflictError, TicketPage, ACTIVE_STATUSES, DEFAULT_USER_DATA
+from storage.journal import Journal
+from storage.archive import ArchiveStore
+from storage.user_registry import UserRegistry
+from storage.id_index import TicketIdIndex
+from storage.timeline import Timeline
+from storage import serializers
+from storage.streaming import stream_snapshot
+from storage.shards import ShardStore, shard_key, write_file_atomic
+from storage.recovery import RecoveryError, recover_file
+from config import (
+    DATA_DIR, DATA_FILE, DATA_JOURNAL_FILE, DATA_PERSIST_MODE, STORAGE_BACKEND,
+    DATA_FORMAT, DATA_LAYOUT, SHARDS_DIR, STREAM_LOAD_MIN_MB, ARCHIVE_DIR, TIMEZONE
+)
 
 logger = logging.getLogger(__name__)
 
-class DataManager:
+
+# Ticket fields other than message history and version, compared as they are stored in slots
+_SCALAR_SLOTS = tuple(slot for slot in Ticket.__slots__ if slot not in ("_messages", "_raw_messages", "version"))
+
+
+def _fingerprint(ticket: Ticket) -> int:
+    """
+    Hash of ticket state: scalar fields and message count
+
+    An undecoded history can't have been changed, so its length is enough;
+    a decoded one is hashed in full.
+    """
+    state = tuple(getattr(ticket, slot) for slot in _SCALAR_SLOTS)
+    if ticket.messages_loaded:
+        return hash((state, tuple((m.sender, m.text, m._at) for m in ticket.messages)))
+    return hash((state, ticket.message_count))
+
+
+def _same_values(current: dict, updates: dict) -> bool:
+    """Check if updates would leave record unchanged (True and 1 differ in JSON)"""
+    return all(
+        key in current and type(current[key]) is type(value) and current[key] == value
+        for key, value in updates.items()
+    )
+
+
+class _Batch:
+    """Mutations collected by DataManager.batch() and state to roll back to"""
+    __slots__ = ("records", "tickets", "users", "unarchived", "on_commit")
+
     def __init__(self):
-        self.data = {"tickets": {}, "users": {}}
+        self.records: List[dict] = []
+        self.tickets: Dict[str, Optional[dict]] = {}  # ticket_id -> state before batch (None = new)
+        self.users: Dict[str, Optional[dict]] = {}
+        self.unarchived: set = set()  # archived tickets brought back by the batch
+        self.on_commit: List[Callable[[], None]] = []  # dropped on rollback
+
+
+class DataManager:
+    def __init__(self, layout: str = DATA_LAYOUT):
+        self.data = {"tickets": {}, "users": UserRegistry()}
+        self.journal = Journal(DATA_JOURNAL_FILE)
+        self.data_format = serializers.available_format(DATA_FORMAT)
+
+        # Sharded layout: only months (and users) changed since last save are rewritten
+        self.sharded = layout == "sharded"
+        self.shards = ShardStore(SHARDS_DIR)
+        self._by_shard: Dict[str, Dict[str, None]] = {}
+        self._dirty_shards: Optional[set] = set()  # None = all shards
+        self._users_dirty = False
+
+        # What load() had to recover, reported to admin after startup
+        self.recovery: List[str] = []
+
+        # Open batch() (mutations are collected and persisted together)
+        self._batch: Optional[_Batch] = None
+        self.archive = ArchiveStore(ARCHIVE_DIR)
+        # Archived tickets changed again (back in working set); their archive copy
+        # is dropped only once a snapshot holding the working-set copy is on disk
+        self._unarchived: set = set()
+        self.dirty = False
+        self._save_lock = asyncio.Lock()
+        self._write_lock = threading.Lock()
+        self._save_task = None
+
+        # No-op writes are skipped: fingerprints of tickets as last loaded/persisted,
+        # digest of last written data.json
+        self._fingerprints: Dict[str, int] = {}
+        self._snapshot_digest: Optional[bytes] = None
+        # Frozen copies of tickets from the last snapshot, reused while they don't change
+        self._frozen: Dict[str, Ticket] = {}
+        self.write_stats = {"performed": 0, "skipped": 0}
+
+        # Secondary indexes (dicts used as ordered sets of ticket ids)
+        self._by_user: Dict[int, Dict[str, None]] = {}
+        self._by_status: Dict[str, Dict[str, None]] = {}
+        self._active_by_user: Dict[int, str] = {}
+        self._indexed: Dict[str, tuple] = {}  # ticket_id -> (user_id, status) as indexed
+        # Ticket ids by creation time for paged listings: per status, None = all tickets
+        self._timelines: Dict[Optional[str], Timeline] = {None: Timeline()}
+        # Sorted ids of working set and archive for partial ticket number lookups
+        self._ticket_ids = TicketIdIndex()
+
+        # Live ticket counters per status for get_stats()
+        self._status_counts: Dict[str, int] = {}
+
+        # Per-day ticket number counters: {"YYYYMMDD": last_number}
+        self._sequences: Dict[str, int] = {}
+        self._sequence_lock = threading.Lock()
+
         self.load()
 
+    @staticmethod
+    def has_stored_data() -> bool:
+        """Check if anything was persisted: snapshot, shards, journal or archive"""
+        if os.path.exists(DATA_FILE) or os.path.exists(DATA_FILE + ".bak") or ShardStore(SHARDS_DIR).exists():
+            return True
+        return Journal(DATA_JOURNAL_FILE).exists() or os.path.exists(os.path.join(ARCHIVE_DIR, "index.json"))
+
     def load(self):
-        """Load data from file"""
-        if os.path.exists(DATA_FILE):
+        """Load data from file (recovering damaged files instead of starting empty)"""
+        sections = None
+        self._clear_indexes()
+        # Shard files on disk are always newer than data.json (it is split in one step)
+        if self.sharded and self.shards.exists():
+            sections = self.shards.load(self._load_entry, self._read_file)
+            if "sequences" not in sections:
+                # Manifest lost or beyond repair - shard files are the data, write a new one
+                self.recovery.append(f"{os.path.relpath(self.shards.manifest_path, DATA_DIR)}: rebuilt from shard files")
+                self._mark_all_dirty()
+            logger.info(f"Loaded {len(self.data['tickets'])} tickets and {len(self.data['users'])} users from shards")
+        elif os.path.exists(DATA_FILE) or os.path.exists(DATA_FILE + ".bak"):
+            if self.sharded:
+                # First start with sharded layout - split data.json on next save
+                logger.info(f"Migrating {DATA_FILE} to sharded layout in {SHARDS_DIR}")
+                self._mark_all_dirty()
+
             try:
-                with open(DATA_FILE, "r", encoding="utf-8") as f:
-                    raw = json.load(f)
-                    self.data["users"] = raw.get("users", {})
-
-                    # Convert tickets to objects
-                    tickets_raw = raw.get("tickets", {})
-                    self.data["tickets"] = {
-                        tid: Ticket.from_dict(tdata) for tid, tdata in tickets_raw.items()
-                    }
-                logger.info(f"Loaded {len(self.data['tickets'])} tickets and {len(self.data['users'])} users")
+                sections = self._read_snapshot()
             except Exception as e:
                 logger.error(f"Error loading data: {e}", exc_info=True)
-                self.data = {"tickets": {}, "users": {}}
+                self.data = {"tickets": {}, "users": UserRegistry()}
+                self._clear_indexes()
+                sections = self._recover_snapshot()
+            logger.info(f"Loaded {len(self.data['tickets'])} tickets and {len(self.data['users'])} users")
 
-    def save(self):
-        """Save data to file"""
+        saved_counters = None
+        if sections is not None:
+            # Stored counters may be ahead of ticket IDs (deleted tickets)
+            for day, num in sections.get("sequences", {}).items():
+                self._sequences[day] = max(num, self._sequences.get(day, 0))
+            saved_counters = sections.get("counters")
+
+        for ticket_id in self.archive.ticket_ids():
+            self._track_sequence(ticket_id)
+        if saved_counters is not None:
+            self._verify_counters(saved_counters)
+
+        # Journal is replayed regardless of mode so switching modes never loses changes
+        if self.journal.exists():
+            self._replay_journal()
+
+        # Crash between archive write and snapshot: working set copy wins
+        stale = [tid for tid in self.data["tickets"] if tid in self.archive]
+        if stale:
+            self.archive.forget(stale)
+
+        self._ticket_ids = TicketIdIndex(list(self.data["tickets"]) + list(self.archive.ticket_ids()))
+
+        if self.recovery and self.dirty:
+            # Write recovered data right away (damaged files are kept aside)
+            self.save()
+
+    def _read_snapshot(self) -> dict:
+        """Read data.json into models, returning remaining sections"""
+        if not os.path.exists(DATA_FILE):
+            raise FileNotFoundError(f"{DATA_FILE} is missing but its previous snapshot exists")
+
+        if os.path.getsize(DATA_FILE) >= STREAM_LOAD_MIN_MB * 1024 * 1024:
+            # Large store: decode one ticket at a time instead of one huge dict
+            return stream_snapshot(DATA_FILE, self._load_entry)
+
+        with open(DATA_FILE, "rb") as f:
+            sections = serializers.loads(f.read())
+        self._load_sections(sections)
+        return sections
+
+    def _load_sections(self, sections: dict):
+        """Move tickets and users from decoded snapshot into models"""
+        for tid, tdata in sections.pop("tickets", {}).items():
+            self._load_entry("tickets", tid, tdata)
+        for uid, udata in sections.pop("users", {}).items():
+            self._load_entry("users", uid, udata)
+
+    def _recover_snapshot(self) -> Optional[dict]:
+        """Load best available copy of damaged data.json"""
+        try:
+            sections, note = recover_file(DATA_FILE, os.path.basename(DATA_FILE))
+        except RecoveryError as e:
+            logger.critical(f"Data recovery failed, starting with empty data: {e}")
+            self.recovery.append(f"{e} - started with empty data")
+            return None
+
+        self.recovery.append(note)
+        self._load_sections(sections)
+        # Whatever was recovered must reach disk even if nothing changes
+        self._mark_all_dirty()
+        return sections
+
+    def _read_file(self, path: str) -> dict:
+        """Decode storage file, falling back to recovered copy (raises RecoveryError)"""
+        try:
+            with open(path, "rb") as f:
+                return serializers.loads(f.read())
+        except Exception as e:
+            logger.error(f"Error loading {path}: {e}", exc_info=True)
+
+        try:
+            data, note = recover_file(path, os.path.relpath(path, DATA_DIR))
+        except RecoveryError as e:
+            self.recovery.append(str(e))
+            raise
+        self.recovery.append(note)
+        self._mark_all_dirty()
+        return data
+
+    def _load_entry(self, section: str, key: str, value: dict):
+        """Add one loaded ticket (building indexes as we go) or user"""
+        if section == "tickets":
+            ticket = Ticket.from_dict(value)
+            self.data["tickets"][key] = ticket
+            self._fingerprints[key] = _fingerprint(ticket)
+            self._index_ticket(ticket)
+            self._track_sequence(ticket.id)
+        else:
+            try:
+                self.data["users"].set(key, value)
+            except ValueError:
+                logger.error(f"Skipping user with invalid id: {key!r}")
+
+    def _replay_journal(self):
+        """Apply journal records on top of loaded snapshot"""
+        applied = 0
         try:
-            # Convert tickets to dict for JSON
-            tickets_dict = {tid: t.to_dict() for tid, t in self.data["tickets"].items()}
+            for record in self._expand_batches(self.journal.replay()):
+                self._mark_changed(record)
+                op = record.get("op")
+                if op == "ticket":
+                    ticket = Ticket.from_dict(record["data"])
+                    self.data["tickets"][ticket.id] = ticket
+                    self._fingerprints[ticket.id] = _fingerprint(ticket)
+                    self._index_ticket(ticket)
+                    self._track_sequence(ticket.id)
+                elif op == "delete":
+                    self._unindex_ticket(record["id"])
+                    self.data["tickets"].pop(record["id"], None)
+                    self._fingerprints.pop(record["id"], None)
+                elif op == "archive":
+                    for ticket_id in record["ids"]:
+                        self._unindex_ticket(ticket_id)
+                        self.data["tickets"].pop(ticket_id, None)
+                        self._fingerprints.pop(ticket_id, None)
+                elif op == "user":
+                    self.data["users"].update(record["id"], record["data"])
+                else:
+                    logger.warning(f"Unknown journal record: {op}")
+                    continue
+                applied += 1
+            logger.info(f"Replayed {applied} journal records")
+        except Exception as e:
+            logger.error(f"Error replaying journal after {applied} records: {e}", exc_info=True)
+
+    def _expand_batches(self, records: Iterator[dict]) -> Iterator[dict]:
+        """Yield single mutations, unpacking batch records"""
+        for record in records:
+            if record.get("op") == "batch":
+                yield from record["records"]
+            else:
+                yield record
+
+    def _mark_changed(self, record: dict):
+        """Remember which shards a mutation touched"""
+        if not self.sharded or self._dirty_shards is None:
+            return
+        op = record.get("op")
+        if op == "ticket":
+            self._dirty_shards.add(shard_key(record["data"]["id"]))
+        elif op == "delete":
+            self._dirty_shards.add(shard_key(record["id"]))
+        elif op == "archive":
+            self._dirty_shards.update(shard_key(tid) for tid in record["ids"])
+        elif op == "user":
+            self._users_dirty = True
+        elif op == "batch":
+            for item in record["records"]:
+                self._mark_changed(item)
+
+    def _unfreeze(self, record: dict):
+        """Drop frozen copies of tickets a mutation changed"""
+        op = record.get("op")
+        if op == "ticket":
+            self._frozen.pop(record["data"]["id"], None)
+        elif op == "delete":
+            self._frozen.pop(record["id"], None)
+        elif op == "archive":
+            for ticket_id in record["ids"]:
+                self._frozen.pop(ticket_id, None)
+        elif op == "batch":
+            for item in record["records"]:
+                self._unfreeze(item)
+
+    def _mark_all_dirty(self):
+        """Make next save rewrite everything (after a failed save or migration)"""
+        self.dirty = True
+        self._dirty_shards = None
+        self._users_dirty = True
+
+    def _persist(self, record: dict):
+        """Persist single mutation according to DATA_PERSIST_MODE"""
+        if self._batch is not None:
+            # Written once when the batch commits
+            self._batch.records.append(record)
+            return
+
+        self._mark_changed(record)
+        self._unfreeze(record)
+        if DATA_PERSIST_MODE == "journal":
+            try:
+                self.journal.append(record)
+                self.write_stats["performed"] += 1
+                return
+            except Exception as e:
+                logger.error(f"Error writing journal, falling back to full save: {e}", exc_info=True)
+
+        self.dirty = True
+        if DATA_PERSIST_MODE == "deferred":
+            # Written by flush() from the auto_save job or on shutdown
+            return
+
+        # Inside the bot: write in background, outside of it (scripts): write now
+        if not self._schedule_save():
+            self.save()
+
+    def _snapshot(self) -> dict:
+        """
+        Freeze current state for _write_snapshot() in another thread
+
+        Only references are copied here: tickets become frozen copies (kept
+        from the previous snapshot for tickets not updated since) and users a
+        copy of the registry columns. Building the plain dicts, the expensive
+        part, is left to _encode_snapshot() in the worker.
+        """
+        self.journal.rotate()
+        self.dirty = False
+        if self.sharded:
+            return self._shard_snapshot()
+        tickets = {tid: self._freeze(tid) for tid in self.data["tickets"]}
+        # Own dict for the worker - updates drop entries from self._frozen meanwhile
+        self._frozen = dict(tickets)
+        return {
+            "tickets": tickets,
+            "users": self.data["users"].copy(),
+            "sequences": dict(self._sequences),
+            "counters": self._counters()
+        }
 
-            output = {
-                "tickets": tickets_dict,
-                "users": self.data["users"]
+    def _freeze(self, ticket_id: str) -> Ticket:
+        """Frozen copy of working-set ticket, reused until the ticket is updated"""
+        frozen = self._frozen.get(ticket_id)
+        if frozen is None:
+            frozen = self._frozen[ticket_id] = self.data["tickets"][ticket_id].copy()
+        return frozen
+
+    def _shard_snapshot(self) -> dict:
+        """Copy changed shards and users (everything after a failed save)"""
+        keys = self._dirty_shards if self._dirty_shards is not None else set(self._by_shard)
+        output = {
+            "shards": {
+                key: {tid: self._freeze(tid) for tid in self._by_shard.get(key, {})}
+                for key in keys
+            },
+            "users": self.data["users"].copy() if self._users_dirty else None,
+            "manifest": {
+                "shards": {key: len(tids) for key, tids in self._by_shard.items() if tids},
+                "sequences": dict(self._sequences),
+                "counters": self._counters()
             }
+        }
+        self._dirty_shards = set()
+        self._users_dirty = False
+        return output
+
+    @staticmethod
+    def _encode_snapshot(output: dict) -> dict:
+        """Turn frozen tickets and users of snapshot into plain dicts"""
+        if "shards" in output:
+            shards = {
+                key: {tid: ticket.to_dict() for tid, ticket in tickets.items()}
+                for key, tickets in output["shards"].items()
+            }
+            users = output["users"].to_dict() if output["users"] is not None else None
+            return {**output, "shards": shards, "users": users}
+        tickets = {tid: ticket.to_dict() for tid, ticket in output["tickets"].items()}
+        return {**output, "tickets": tickets, "users": output["users"].to_dict()}
+
+    def _write_snapshot(self, output: dict):
+        """Atomically replace data.json (or changed shard files) with snapshot"""
+        output = self._encode_snapshot(output)
+        with self._write_lock:
+            if self.sharded:
+                self.shards.write(output["shards"], output["users"], output["manifest"], self.data_format)
+            else:
+                payload = serializers.dumps(output, self.data_format)
+                digest = hashlib.blake2b(payload, digest_size=16).digest()
+                if digest == self._snapshot_digest and os.path.exists(DATA_FILE):
+                    # Same content as the file on disk
+                    self.write_stats["skipped"] += 1
+                    return
+                write_file_atomic(DATA_FILE, payload, keep_previous=True)
+                self._snapshot_digest = digest
+            self.write_stats["performed"] += 1
 
-            with open(DATA_FILE, "w", encoding="utf-8") as f:
-                json.dump(output, f, ensure_ascii=False, indent=2)
+    def _write_and_settle(self, output: dict, unarchived: set):
+        """Write snapshot, then drop archive copies of tickets it now holds"""
+        self._write_snapshot(output)
+        if unarchived:
+            self.archive.forget(unarchived)
+
+    def save(self):
+        """Save data to file"""
+        unarchived = set()
+        try:
+            output = self._snapshot()
+            unarchived, self._unarchived = self._unarchived, set()
+            self._write_and_settle(output, unarchived)
+
+            # Snapshot now contains every journaled change
+            self.journal.discard_rotated()
             logger.debug("Data saved successfully")
         except Exception as e:
+            self._unarchived |= {tid for tid in unarchived if tid in self.archive}
+            self._mark_all_dirty()
             logger.error(f"Error saving data: {e}", exc_info=True)
 
+    async def save_async(self):
+        """Save data to file without blocking the event loop"""
+        async with self._save_lock:
+            unarchived = set()
+            try:
+                output = self._snapshot()
+                unarchived, self._unarchived = self._unarchived, set()
+                loop = asyncio.get_running_loop()
+                await loop.run_in_executor(None, self._write_and_settle, output, unarchived)
+
+                self.journal.discard_rotated()
+                logger.debug("Data saved successfully")
+            except Exception as e:
+                self._unarchived |= {tid for tid in unarchived if tid in self.archive}
+                self._mark_all_dirty()
+                logger.error(f"Error saving data: {e}", exc_info=True)
+
+    def _schedule_save(self) -> bool:
+        """Start background save if called from the event loop"""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return False
+
+        # One running task picks up all changes made while it writes
+        if self._save_task is None or self._save_task.done():
+            self._save_task = loop.create_task(self._save_pending())
+        return True
+
+    async def _save_pending(self):
+        """Save until no unsaved changes remain"""
+        while self.dirty:
+            await self.save_async()
+            if self.dirty:
+                # Failed or changed again while writing - don't spin on errors
+                await asyncio.sleep(1)
+
+    async def flush_async(self):
+        """Save data in background only if there are unsaved changes"""
+        if self.dirty:
+            await self.save_async()
+
+    async def compact_async(self):
+        """Fold journal into a fresh snapshot so replay on startup stays short"""
+        journal_size = self.journal.size()
+        if not journal_size and not self.dirty:
+            return
+
+        # Snapshot is written in a worker thread, journal rotated and dropped once it's on disk
+        await self.save_async()
+        if self.dirty:
+            logger.warning("Storage compaction failed, journal kept for next attempt")
+        else:
+            logger.info(
+                f"Storage compacted: {journal_size} bytes of journal folded into snapshot "
+                f"(writes: {self.write_stats['performed']} performed, {self.write_stats['skipped']} skipped)"
+            )
+
+    # ========== BATCH ==========
+
+    @contextmanager
+    def batch(self):
+        """
+        Group mutations into a single persist, rolling them back on exception
+
+        Tickets read from storage inside the block are restored to the state
+        they had when first read; objects fetched before the block are not tracked.
+        """
+        if self._batch is not None:
+            # Nested batch joins the outer one
+            yield
+            return
+
+        self._batch = _Batch()
+        try:
+            yield
+        except BaseException:
+            batch, self._batch = self._batch, None
+            self._rollback(batch)
+            raise
+
+        batch, self._batch = self._batch, None
+        if len(batch.records) == 1:
+            self._persist(batch.records[0])
+        elif batch.records:
+            # One journal line, so a crash can't leave half of the batch applied
+            self._persist({"op": "batch", "records": batch.records})
+        for callback in batch.on_commit:
+            callback()
+
+    def on_commit(self, callback: Callable[[], None]):
+        """
+        Run callback once current changes are committed (right away outside batch())
+
+        For state kept outside storage (search index, deadlines): a rolled
+        back batch drops its callbacks, so such state never runs ahead of storage.
+        """
+        if self._batch is not None:
+            self._batch.on_commit.append(callback)
+        else:
+            callback()
+
+    def _track(self, ticket: Optional[Ticket]) -> Optional[Ticket]:
+        """Remember state of ticket handed out inside batch() for rollback"""
+        if ticket is None:
+            return None
+        if self._batch is not None and ticket.id not in self._batch.tickets:
+            self._batch.tickets[ticket.id] = ticket.to_dict()
+        return ticket
+
+    def _track_all(self, tickets: List[Ticket]) -> List[Ticket]:
+        if self._batch is not None:
+            for ticket in tickets:
+                self._track(ticket)
+        return tickets
+
+    def _rollback(self, batch: _Batch):
+        """Restore tickets and users changed inside a failed batch"""
+        for ticket_id in batch.unarchived:
+            # Only in the archive before the batch - archive copy is still current
+            self._unarchived.discard(ticket_id)
+            self._unindex_ticket(ticket_id)
+            self.data["tickets"].pop(ticket_id, None)
+
+        for ticket_id, state in batch.tickets.items():
+            if ticket_id in batch.unarchived:
+                continue
+            if state is None:
+                self._unindex_ticket(ticket_id)
+                self._ticket_ids.remove(ticket_id)
+                self.data["tickets"].pop(ticket_id, None)
+                continue
+
+            original = Ticket.from_dict(state)
+            ticket = self.data["tickets"].get(ticket_id)
+            if ticket is not None:
+                # Restore in place so callers holding the object see the old state too
+                for slot in Ticket.__slots__:
+                    setattr(ticket, slot, getattr(original, slot))
+            else:
+                ticket = self.data["tickets"][ticket_id] = original
+            self._index_ticket(ticket)
+
+        # Ticket changes of the batch were never persisted
+        for record in batch.records:
+            if record["op"] == "ticket":
+                self._fingerprints.pop(record["data"]["id"], None)
+
+        for user_id_str, state in batch.users.items():
+            if state is None:
+                self.data["users"].remove(user_id_str)
+            else:
+                self.data["users"].set(user_id_str, state)
+
+        logger.warning(f"Batch rolled back: {len(batch.records)} changes discarded")
+
+    # ========== INDEXES ==========
+
+    def _clear_indexes(self):
+        """Reset secondary indexes, counters and sequences before (re)loading"""
+        self._by_user = {}
+        self._by_status = {}
+        self._active_by_user = {}
+        self._indexed = {}
+        self._status_counts = {}
+        self._sequences = {}
+        self._by_shard = {}
+        self._fingerprints = {}
+        self._frozen = {}
+        self._timelines = {None: Timeline()}
+
+    def _index_ticket(self, ticket: Ticket):
+        """Add ticket to indexes (re-indexes if user or status changed)"""
+        indexed = self._indexed.get(ticket.id)
+        if indexed == (ticket.user_id, ticket.status):
+            return
+        if indexed:
+            self._unindex_ticket(ticket.id)
+
+        self._indexed[ticket.id] = (ticket.user_id, ticket.status)
+        self._by_user.setdefault(ticket.user_id, {})[ticket.id] = None
+        self._by_status.setdefault(ticket.status, {})[ticket.id] = None
+        self._status_counts[ticket.status] = self._status_counts.get(ticket.status, 0) + 1
+        if self.sharded:
+            self._by_shard.setdefault(shard_key(ticket.id), {})[ticket.id] = None
+
+        stamp = ticket.created_at.timestamp()
+        self._timelines[None].add(stamp, ticket.id)
+        if ticket.status not in self._timelines:
+            self._timelines[ticket.status] = Timeline()
+        self._timelines[ticket.status].add(stamp, ticket.id)
+
+        if ticket.status in ACTIVE_STATUSES:
+            current = self.data["tickets"].get(self._active_by_user.get(ticket.user_id))
+            if current is None or ticket.created_at >= current.created_at:
+                self._active_by_user[ticket.user_id] = ticket.id
+
+    def _unindex_ticket(self, ticket_id: str):
+        """Remove ticket from indexes"""
+        indexed = self._indexed.pop(ticket_id, None)
+        if not indexed:
+            return
+        user_id, status = indexed
+
+        self._by_user.get(user_id, {}).pop(ticket_id, None)
+        if not self._by_user.get(user_id):
+            self._by_user.pop(user_id, None)
+        self._by_status.get(status, {}).pop(ticket_id, None)
+        self._status_counts[status] -= 1
+        if self.sharded:
+            self._by_shard.get(shard_key(ticket_id), {}).pop(ticket_id, None)
+
+        ticket = self.data["tickets"].get(ticket_id)
+        stamp = ticket.created_at.timestamp() if ticket is not None else None
+        self._timelines[None].remove(stamp, ticket_id)
+        if status in self._timelines:
+            self._timelines[status].remove(stamp, ticket_id)
+
+        if self._active_by_user.get(user_id) == ticket_id:
+            # Fall back to user's next most recent active ticket (users have few tickets)
+            del self._active_by_user[user_id]
+            candidates = [
+                self.data["tickets"][tid] for tid in self._by_user.get(user_id, {})
+                if self._indexed[tid][1] in ACTIVE_STATUSES and tid in self.data["tickets"]
+            ]
+            if candidates:
+                self._active_by_user[user_id] = max(candidates, key=lambda t: t.created_at).id
+
+    # ========== TICKET ID SEQUENCE ==========
+
+    def _track_sequence(self, ticket_id: str):
+        """Raise day counter to cover existing ticket ID (T-YYYYMMDD-NNNN)"""
+        parts = ticket_id.split("-")
+        if len(parts) != 3 or not parts[2].isdigit():
+            return
+        day, num = parts[1], int(parts[2])
+        if num > self._sequences.get(day, 0):
+            self._sequences[day] = num
+
+    def next_ticket_number(self, day: str) -> int:
+        """Hand out next ticket number for day (YYYYMMDD)"""
+        with self._sequence_lock:
+            num = self._sequences.get(day, 0) + 1
+            self._sequences[day] = num
+            return num
+
+    # ========== TICKETS ==========
+
     def get_ticket(self, ticket_id: str) -> Optional[Ticket]:
-        """Get ticket by ID"""
-        return self.data["tickets"].get(ticket_id)
+        """Get ticket by ID (archived tickets are loaded from disk)"""
+        ticket = self.data["tickets"].get(ticket_id)
+        if ticket is None and ticket_id in self.archive:
+            ticket = self.archive.get(ticket_id)
+        return self._track(ticket)
+
+    def match_ticket_ids(self, fragment: str, limit: int = 10) -> List[str]:
+        """IDs starting or ending with fragment, newest first (no ticket is loaded)"""
+        return self._ticket_ids.match(fragment, limit)
+
+    def find_tickets(self, fragment: str, limit: int = 10) -> List[Ticket]:
+        """Tickets whose ID starts or ends with fragment ("20251110-00", "0412"), newest first"""
+        tickets = [self.get_ticket(ticket_id) for ticket_id in self.match_ticket_ids(fragment, limit)]
+        return [ticket for ticket in tickets if ticket is not None]
+
+    def find_ticket(self, fragment: str) -> Optional[Ticket]:
+        """Find ticket whose ID contains fragment (working set first, then archive)"""
+        tickets = self.find_tickets(fragment, 1)
+        if tickets:
+            return tickets[0]
+        # Fragment from the middle of an ID - scan
+        for ticket_id in self.data["tickets"]:
+            if fragment in ticket_id:
+                return self._track(self.data["tickets"][ticket_id])
+        for ticket_id in self.archive.ticket_ids():
+            if fragment in ticket_id:
+                return self._track(self.archive.get(ticket_id))
+        return None
 
     def create_ticket(self, ticket: Ticket):
         """Create new ticket"""
+        if self._batch is not None:
+            self._batch.tickets.setdefault(ticket.id, None)
         self.data["tickets"][ticket.id] = ticket
-        self.save()
+        self._index_ticket(ticket)
+        self._ticket_ids.add(ticket.id)
+        self._fingerprints[ticket.id] = _fingerprint(ticket)
+        self._persist({"op": "ticket", "data": ticket.to_dict()})
+
+    def update_ticket(self, ticket: Ticket, expected_version: Optional[int] = None):
+        """
+        Update existing ticket
+
+        With expected_version the update is a compare-and-set: it raises
+        TicketConflictError if the stored ticket has another version. Pass a
+        copy() of the stored ticket, so a rejected change is not left in it.
+        """
+        if expected_version is not None:
+            stored = self.data["tickets"].get(ticket.id)
+            if stored is None and ticket.id in self.archive:
+                stored = self.archive.get(ticket.id)
+            # Only update_ticket() bumps the stored version, changes in place don't
+            if stored is not None and stored.version != expected_version:
+                raise TicketConflictError(
+                    f"Ticket {ticket.id} is at version {stored.version}, expected {expected_version}"
+                )
+
+        if ticket.id in self.archive and ticket.id not in self.data["tickets"]:
+            # Changed after archiving (e.g. late rating) - bring back to working set.
+            # Until saved, both copies exist; load() prefers the working-set one
+            self._unarchived.add(ticket.id)
+            if self._batch is not None:
+                self._batch.unarchived.add(ticket.id)
+            self.data["tickets"][ticket.id] = ticket
 
-    def update_ticket(self, ticket: Ticket):
-        """Update existing ticket"""
         if ticket.id in self.data["tickets"]:
+            fingerprint = _fingerprint(ticket)
+            if fingerprint == self._fingerprints.get(ticket.id):
+                # Nothing changed since it was loaded or last persisted
+                self.write_stats["skipped"] += 1
+                return
+            self._fingerprints[ticket.id] = fingerprint
+
+            ticket.version = self.data["tickets"][ticket.id].version + 1
             self.data["tickets"][ticket.id] = ticket
-            self.save()
+            self._index_ticket(ticket)
+            self._persist({"op": "ticket", "data": ticket.to_dict()})
 
     def delete_ticket(self, ticket_id: str):
         """Delete ticket"""
         if ticket_id in self.data["tickets"]:
+            self._track(self.data["tickets"][ticket_id])
+            self._unindex_ticket(ticket_id)
+            self._ticket_ids.remove(ticket_id)
+            self._fingerprints.pop(ticket_id, None)
             del self.data["tickets"][ticket_id]
-            self.save()
+            self._persist({"op": "delete", "id": ticket_id})
 
     def get_all_tickets(self) -> List[Ticket]:
         """Get all tickets"""
-        return list(self.data["tickets"].values())
+        return self._track_all(list(self.data["tickets"].values()))
+
+    def get_message_counts(self) -> Dict[str, int]:
+        """Number of messages of each ticket, without decoding histories"""
+        return {tid: ticket.message_count for tid, ticket in self.data["tickets"].items()}
 
     def get_tickets_by_status(self, status: str) -> List[Ticket]:
         """Get tickets by status"""
-        return [t for t in self.data["tickets"].values() if t.status == status]
+        return self._track_all([self.data["tickets"][tid] for tid in self._by_status.get(status, {})])
+
+    def get_active_tickets(self) -> List[Ticket]:
+        """Get all active tickets (new or working)"""
+        tickets = []
+        for status in ACTIVE_STATUSES:
+            tickets.extend(self.get_tickets_by_status(status))
+        return tickets
+
+    def get_tickets_page(
+        self,
+        status: Optional[str] = None,
+        cursor: Optional[str] = None,
+        limit: int = 10,
+        newer: bool = False
+    ) -> TicketPage:
+        """
+        One page of tickets, newest first (status None = all statuses)
+
+        cursor comes from a previous page (TicketPage.older, or TicketPage.newer
+        with newer=True); without it the newest page is returned.
+        """
+        timeline = self._timelines.get(status)
+        if timeline is None:
+            return TicketPage([], 0, None, None)
+        ids, newer_cursor, older_cursor = timeline.page(limit, cursor, newer)
+        tickets = self._track_all([self.data["tickets"][tid] for tid in ids])
+        return TicketPage(tickets, len(timeline), newer_cursor, older_cursor)
+
+    def get_user_tickets(self, user_id: int) -> List[Ticket]:
+        """Get all tickets of user"""
+        return self._track_all([self.data["tickets"][tid] for tid in self._by_user.get(user_id, {})])
+
+    def get_user_ticket_ids(self, user_id: int) -> List[str]:
+        """IDs of all tickets of user, archived too, newest first (no ticket is loaded)"""
+        ticket_ids = set(self._by_user.get(user_id, {})) | set(self.archive.user_ticket_ids(user_id))
+        return sorted(ticket_ids, reverse=True)
+
+    def get_ticket_users(self, after: Optional[str] = None) -> List[tuple]:
+        """(ticket_id, user_id, username) of working-set tickets created after ticket id"""
+        tickets = self.data["tickets"]
+        return [
+            (tid, tickets[tid].user_id, tickets[tid].username)
+            for tid in self._ticket_ids.after(after) if tid in tickets
+        ]
+
+    def get_user_active_ticket(self, user_id: int) -> Optional[Ticket]:
+        """Get user's most recent active ticket"""
+        ticket_id = self._active_by_user.get(user_id)
+        return self._track(self.data["tickets"].get(ticket_id)) if ticket_id else None
+
+    # ========== ARCHIVE ==========
+
+    async def archive_closed_tickets_async(self, after_days: int) -> int:
+        """Move closed tickets inactive for after_days to the cold archive"""
+        cutoff = datetime.now(TIMEZONE) - timedelta(days=after_days)
+        candidates = {}
+        for ticket_id in self._by_status.get("done", {}):
+            ticket = self.data["tickets"][ticket_id]
+            last_activity = ticket.last_activity_at or ticket.created_at
+            if last_activity.tzinfo is None:
+                last_activity = last_activity.replace(tzinfo=TIMEZONE)
+            if last_activity < cutoff:
+                candidates[ticket_id] = ticket.to_dict()
+
+        if not candidates:
+            return 0
+
+        # Compress and write segments off the event loop
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self.archive.append, list(candidates.values()))
+
+        # Tickets changed while segments were written stay in the working set
+        moved, changed = [], []
+        for ticket_id, snapshot in candidates.items():
+            ticket = self.data["tickets"].get(ticket_id)
+            if ticket is not None and ticket.to_dict() == snapshot:
+                moved.append(ticket_id)
+            else:
+                changed.append(ticket_id)
+        if changed:
+            self.archive.forget(changed)
+
+        for ticket_id in moved:
+            # Archived again before its un-archiving was saved - new copy is current
+            self._unarchived.discard(ticket_id)
+            self._unindex_ticket(ticket_id)
+            self._fingerprints.pop(ticket_id, None)
+            del self.data["tickets"][ticket_id]
+        self._persist({"op": "archive", "ids": moved})
+
+        logger.info(f"Archived {len(moved)} closed tickets ({len(self.data['tickets'])} left in memory)")
+        return len(moved)
+
+    # ========== USERS ==========
+
+    def peek_user_data(self, user_id: int) -> Mapping:
+        """Read-only view of user data (defaults for unknown users, nothing is stored)"""
+        user_data = self.data["users"].get(user_id)
+        return MappingProxyType(user_data) if user_data is not None else DEFAULT_USER_DATA
 
     def get_user_data(self, user_id: int) -> dict:
-        """Get user data"""
-        user_id_str = str(user_id)
-        if user_id_str not in self.data["users"]:
-            self.data["users"][user_id_str] = {
-                "last_review": None,
-                "last_suggestion": None,
-                "thanked": False
-            }
-        return self.data["users"][user_id_str]
+        """Copy of user data (changes are stored only by update_user_data)"""
+        return dict(self.peek_user_data(user_id))
 
     def update_user_data(self, user_id: int, updates: dict):
         """Update user data"""
         user_id_str = str(user_id)
-        if user_id_str not in self.data["users"]:
-            self.data["users"][user_id_str] = {}
-        self.data["users"][user_id_str].update(updates)
-        self.save()
+        users = self.data["users"]
+        current = users.get(user_id)
+        if current is not None and _same_values(current, updates):
+            # E.g. same locale chosen again
+            self.write_stats["skipped"] += 1
+            return
+        if self._batch is not None and user_id_str not in self._batch.users:
+            self._batch.users[user_id_str] = current
+        record = updates
+        if user_id not in users:
+            # First write creates the user - journal gets the full record
+            users.set(user_id, DEFAULT_USER_DATA)
+            users.update(user_id, updates)
+            record = users.get(user_id)
+        else:
+            users.update(user_id, updates)
+        self._persist({"op": "user", "id": user_id_str, "data": dict(record)})
+
+    def get_user_locale(self, user_id: int) -> Optional[str]:
+        """Saved locale of user (None if not set)"""
+        return self.data["users"].get_value(user_id, "locale")
+
+    # ========== STATISTICS ==========
+
+    def _counters(self) -> dict:
+        """Current counters in the form stored in data.json"""
+        return {
+            "tickets": sum(self._status_counts.values()),
+            "users": len(self.data["users"]),
+            "statuses": {s: n for s, n in self._status_counts.items() if n},
+            "archived": self._archived_count()
+        }
+
+    def _archived_count(self) -> int:
+        """Archived tickets not counted in the working set"""
+        return len(self.archive) - len(self._unarchived)
+
+    def _verify_counters(self, saved: dict):
+        """Compare counters saved with snapshot against full recount done on load"""
+        current = self._counters()
+        # Snapshots from older versions may lack some counters
+        current = {key: current[key] for key in saved if key in current}
+        if saved != current:
+            logger.warning(f"Stored counters {saved} don't match recount {current}, using recount")
 
     def get_stats(self) -> dict:
         """Get statistics"""
-        tickets = self.get_all_tickets()
+        # Archived tickets are always closed
+        archived = self._archived_count()
         return {
             "total_users": len(self.data["users"]),
-            "total_tickets": len(tickets),
-            "active_tickets": len([t for t in tickets if t.status in ["new", "working"]]),
-            "closed_tickets": len([t for t in tickets if t.status == "done"])
+            "total_tickets": sum(self._status_counts.values()) + archived,
+            "active_tickets": sum(self._status_counts.get(s, 0) for s in ACTIVE_STATUSES),
+            "closed_tickets": self._status_counts.get("done", 0) + archived
         }
 
+def create_data_manager():
+    """Create storage backend selected by STORAGE_BACKEND"""
+    if STORAGE_BACKEND == "sqlite":
+        from storage.sqlite_manager import SQLiteDataManager
+        return SQLiteDataManager()
+    return DataManager()
+
 # Global instance
-data_manager = DataManager()
+data_manager = create_data_manager()
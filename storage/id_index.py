@@ -0,0 +1,76 @@
+"""
+Sorted ticket ids for partial ticket number lookups (admin search, inline mode)
+
+Admins type the start of an id ("20251110-00", "T-202511") or the end of it
+("0412", "412"). Ids are kept in a sorted list and, reversed, in a second
+sorted list, so both are a binary search plus a slice instead of a scan:
+
+    prefix "20251110-00" -> range of "T-20251110-00..." in ids
+    suffix "0412"        -> range of "2140..." in reversed ids
+"""
+
+import heapq
+from bisect import bisect_left, bisect_right, insort
+from typing import Iterable, List, Optional
+
+# Shorter fragments match a tenth of all ids by suffix - prefix matches only
+MIN_SUFFIX = 2
+
+
+def _range(keys: List[str], prefix: str) -> tuple:
+    """Slice bounds of keys starting with prefix"""
+    start = bisect_left(keys, prefix)
+    end = bisect_left(keys, prefix[:-1] + chr(ord(prefix[-1]) + 1), start)
+    return start, end
+
+
+class TicketIdIndex:
+    """Ticket ids sorted as is and reversed"""
+
+    def __init__(self, ticket_ids: Iterable[str] = ()):
+        self._ids = sorted(ticket_ids)
+        self._reversed = sorted(ticket_id[::-1] for ticket_id in self._ids)
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, ticket_id: str) -> bool:
+        i = bisect_left(self._ids, ticket_id)
+        return i < len(self._ids) and self._ids[i] == ticket_id
+
+    def add(self, ticket_id: str):
+        if not self._ids or ticket_id > self._ids[-1]:
+            # New tickets have the largest id
+            self._ids.append(ticket_id)
+        elif ticket_id in self:
+            return
+        else:
+            insort(self._ids, ticket_id)
+        insort(self._reversed, ticket_id[::-1])
+
+    def remove(self, ticket_id: str):
+        for keys, key in ((self._ids, ticket_id), (self._reversed, ticket_id[::-1])):
+            i = bisect_left(keys, key)
+            if i < len(keys) and keys[i] == key:
+                del keys[i]
+
+    def after(self, ticket_id: Optional[str]) -> List[str]:
+        """Ids sorting after ticket_id (tickets created since it), all ids for None"""
+        return self._ids[bisect_right(self._ids, ticket_id):] if ticket_id else list(self._ids)
+
+    def match(self, fragment: str, limit: int) -> List[str]:
+        """Up to limit ids starting or ending with fragment, newest first"""
+        fragment = fragment.strip().lstrip("#").upper()
+        if not fragment or limit <= 0:
+            return []
+
+        prefix = fragment if fragment.startswith("T-") else "T-" + fragment
+        start, end = _range(self._ids, prefix)
+        found = self._ids[max(start, end - limit):end]
+
+        start, end = _range(self._reversed, fragment[::-1]) if len(fragment) >= MIN_SUFFIX else (0, 0)
+        if start < end:
+            # Reversed order is not by date - pick the largest (newest) ids
+            found += heapq.nlargest(limit, (key[::-1] for key in self._reversed[start:end]))
+
+        return sorted(set(found), reverse=True)[:limit]
@@ -0,0 +1,97 @@
+"""
+Append-only journal for DataManager mutations
+
+Each mutation is written as one compact JSON record per line, so the cost
+of persisting a change does not depend on how many tickets are stored.
+The journal is replayed on top of the data.json snapshot at load time.
+
+When a snapshot is started the live journal is rotated to <path>.prev, so
+records appended while the snapshot is being written are kept, and the
+rotated part is discarded once the snapshot is safely on disk.
+"""
+
+import json
+import os
+import logging
+from typing import Iterator
+
+logger = logging.getLogger(__name__)
+
+
+class Journal:
+    """Write-ahead log of ticket/user changes"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.rotated_path = path + ".prev"
+        self._fh = None
+
+    def append(self, record: dict):
+        """Append one record to the journal"""
+        if self._fh is None:
+            self._fh = open(self.path, "a", encoding="utf-8")
+
+        line = json.dumps(record, ensure_ascii=False, separators=(",", ":"))
+        self._fh.write(line + "\n")
+        self._fh.flush()
+
+    def replay(self) -> Iterator[dict]:
+        """Yield journal records in write order (rotated part first)"""
+        for path in (self.rotated_path, self.path):
+            if os.path.exists(path):
+                yield from self._read(path)
+
+    def _read(self, path: str) -> Iterator[dict]:
+        """Yield records from a single journal file"""
+        with open(path, "r", encoding="utf-8") as f:
+            for line_no, line in enumerate(f, start=1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    # Torn write from a crash - everything after it is unreliable
+                    logger.warning(f"Journal {path}: skipping damaged record at line {line_no} and below")
+                    return
+
+    def rotate(self):
+        """Move live records aside before a snapshot is taken"""
+        self.close()
+        if not os.path.exists(self.path):
+            return
+
+        if os.path.exists(self.rotated_path):
+            # Previous snapshot failed - keep both parts in order
+            with open(self.rotated_path, "a", encoding="utf-8") as dst, \
+                    open(self.path, "r", encoding="utf-8") as src:
+                for line in src:
+                    dst.write(line)
+            os.remove(self.path)
+        else:
+            os.replace(self.path, self.rotated_path)
+
+    def discard_rotated(self):
+        """Drop rotated records (called after the snapshot is written)"""
+        if os.path.exists(self.rotated_path):
+            os.remove(self.rotated_path)
+
+    def close(self):
+        """Close journal file handle"""
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
+
+    def size(self) -> int:
+        """Total size of journal files in bytes"""
+        return sum(
+            os.path.getsize(path) for path in (self.rotated_path, self.path)
+            if os.path.exists(path)
+        )
+
+    def exists(self) -> bool:
+        """Check if journal has any records on disk"""
+        return any(
+            os.path.exists(path) and os.path.getsize(path) > 0
+            for path in (self.rotated_path, self.path)
+        )
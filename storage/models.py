@@ -1,9 +1,89 @@
+import sys
 from datetime import datetime
-from typing import List, Dict, Optional
+from types import MappingProxyType
+from typing import Callable, List, Dict, NamedTuple, Optional, Union
+from config import TIMEZONE
+
+# Ticket statuses that still need support attention
+ACTIVE_STATUSES = ("new", "working")
+
+# Data of users that have nothing stored yet (read-only, shared by all lookups)
+DEFAULT_USER_DATA = MappingProxyType({
+    "last_review": None,
+    "last_suggestion": None,
+    "thanked": False
+})
+
+
+def _intern(value: Optional[str]) -> Optional[str]:
+    """Share one copy of small repeated strings (sender, status, last_actor, username)"""
+    return sys.intern(value) if value is not None else None
+
+
+def _pack_time(value: Optional[datetime]) -> Union[float, datetime, None]:
+    """Store aware datetime as epoch seconds (24 bytes instead of 48) if it reads back the same"""
+    if isinstance(value, datetime) and value.tzinfo is not None:
+        stamp = value.timestamp()
+        # Other UTC offsets than configured timezone's are kept, so to_dict() doesn't change them
+        if value.utcoffset() == datetime.fromtimestamp(stamp, TIMEZONE).utcoffset():
+            return stamp
+    # Naive datetimes from old data are kept as is to avoid guessing their zone
+    return value
+
+
+def _unpack_time(value: Union[float, datetime, None]) -> Optional[datetime]:
+    """Convert stored timestamp back to datetime in configured timezone"""
+    if isinstance(value, float):
+        return datetime.fromtimestamp(value, TIMEZONE)
+    return value
+
+
+def _time_property(slot: str) -> property:
+    """Datetime attribute backed by a packed epoch slot"""
+    return property(
+        lambda self: _unpack_time(getattr(self, slot)),
+        lambda self, value: setattr(self, slot, _pack_time(value))
+    )
+
+
+# Separator of message times in packed history (can't occur in an ISO datetime)
+_AT_SEPARATOR = "\n"
+
+
+def _pack_raw_messages(messages: List[dict]) -> tuple:
+    """
+    Keep message dicts as one flat tuple - far cheaper than Message objects to build
+
+    The tuple is (sender, text, sender, text, ..., times): all "at" strings,
+    kept verbatim, are joined into one, which takes half the memory of
+    separate strings and costs nothing to build.
+    """
+    raw = []
+    times = []
+    for m in messages:
+        raw += (_intern(m["sender"]), m.get("text"))
+        times.append(m["at"])
+    if times:
+        raw.append(_AT_SEPARATOR.join(times))
+    return tuple(raw)
+
+
+def _raw_times(raw: tuple) -> List[str]:
+    """Message times ("at" strings) of packed history"""
+    return raw[-1].split(_AT_SEPARATOR) if raw else []
+
+
+class TicketConflictError(Exception):
+    """Ticket was changed by someone else since it was read"""
+
 
 class Message:
+    __slots__ = ("sender", "text", "_at")
+
+    at = _time_property("_at")
+
     def __init__(self, sender: str, text: Optional[str], at: datetime):
-        self.sender = sender
+        self.sender = _intern(sender)
         self.text = text
         self.at = at
 
@@ -23,6 +103,16 @@ class Message:
         )
 
 class Ticket:
+    __slots__ = (
+        "id", "user_id", "_created_at", "status", "_messages", "_raw_messages", "assigned",
+        "last_actor", "_last_activity_at", "_first_response_at", "rated", "rating",
+        "feedback_invited", "review_received", "suggestion_received", "username", "version"
+    )
+
+    created_at = _time_property("_created_at")
+    last_activity_at = _time_property("_last_activity_at")
+    first_response_at = _time_property("_first_response_at")
+
     def __init__(
         self,
         ticket_id: str,
@@ -39,31 +129,109 @@ class Ticket:
         feedback_invited: bool = False,
         review_received: bool = False,
         suggestion_received: bool = False,
-        username: Optional[str] = None
+        username: Optional[str] = None,
+        version: int = 0
     ):
         self.id = ticket_id
         self.user_id = user_id
         self.created_at = created_at
-        self.status = status
+        self.status = _intern(status)
+        self._raw_messages = None
         self.messages = messages
         self.assigned = assigned
-        self.last_actor = last_actor
+        self.last_actor = _intern(last_actor)
         self.last_activity_at = last_activity_at
         self.first_response_at = first_response_at
         self.rated = rated
-        self.rating = rating
+        self.rating = _intern(rating)
         self.feedback_invited = feedback_invited
         self.review_received = review_received
         self.suggestion_received = suggestion_received
-        self.username = username
+        self.username = _intern(username)
+        # Bumped by storage on every stored change - used for compare-and-set
+        self.version = version
+
+    @property
+    def messages(self) -> List[Message]:
+        """Message history, decoded on first access"""
+        if self._messages is None:
+            raw = self._load_raw_messages()
+            self._messages = [
+                Message(raw[2 * i], raw[2 * i + 1], datetime.fromisoformat(at))
+                for i, at in enumerate(_raw_times(raw))
+            ]
+            self._raw_messages = None
+        return self._messages
+
+    @messages.setter
+    def messages(self, value: Optional[List[Message]]):
+        self._messages = value
+        if value is not None:
+            self._raw_messages = None
+
+    @property
+    def messages_loaded(self) -> bool:
+        """Check if message history was decoded (and so may have been changed)"""
+        return self._messages is not None
+
+    def _load_raw_messages(self) -> tuple:
+        """Undecoded history as flat (sender, text, ..., times) tuple, see _pack_raw_messages()"""
+        if callable(self._raw_messages):
+            self._raw_messages = _pack_raw_messages(self._raw_messages())
+        return self._raw_messages or ()
+
+    @property
+    def message_count(self) -> int:
+        """Number of messages without decoding history"""
+        if self._messages is not None:
+            return len(self._messages)
+        return len(self._load_raw_messages()) // 2
+
+    @property
+    def first_message_text(self) -> Optional[str]:
+        """Text of first message without decoding history"""
+        if self._messages is not None:
+            return self._messages[0].text if self._messages else None
+        raw = self._load_raw_messages()
+        return raw[1] if raw else None
+
+    def message_texts(self, start: int = 0) -> List[Optional[str]]:
+        """Texts of messages from start on, without decoding history"""
+        if self._messages is not None:
+            return [m.text for m in self._messages[start:]]
+        return list(self._load_raw_messages()[start * 2 + 1:-1:2])
+
+    def copy(self) -> 'Ticket':
+        """
+        Copy sharing all values
+
+        Changing the copy (messages included) leaves this ticket as it is, and
+        the copy is safe to to_dict() in another thread while this one changes.
+        """
+        copy = Ticket.__new__(Ticket)
+        for slot in Ticket.__slots__:
+            setattr(copy, slot, getattr(self, slot))
+        if self._messages is not None:
+            # Messages are never changed once added - copying the list is enough
+            copy._messages = list(self._messages)
+        return copy
 
     def to_dict(self) -> dict:
+        if self._messages is None:
+            # Not decoded - stored history is still current
+            raw = self._load_raw_messages()
+            messages = [
+                {"sender": raw[2 * i], "text": raw[2 * i + 1], "at": at}
+                for i, at in enumerate(_raw_times(raw))
+            ]
+        else:
+            messages = [m.to_dict() for m in self._messages]
         return {
             "id": self.id,
             "user_id": self.user_id,
             "created_at": self.created_at.isoformat(),
             "status": self.status,
-            "messages": [m.to_dict() for m in self.messages],
+            "messages": messages,
             "assigned": self.assigned,
             "last_actor": self.last_actor,
             "last_activity_at": self.last_activity_at.isoformat() if self.last_activity_at else None,
@@ -73,17 +241,19 @@ class Ticket:
             "feedback_invited": self.feedback_invited,
             "review_received": self.review_received,
             "suggestion_received": self.suggestion_received,
-            "username": self.username
+            "username": self.username,
+            "version": self.version
         }
 
     @staticmethod
-    def from_dict(data: dict) -> 'Ticket':
-        return Ticket(
+    def from_dict(data: dict, messages_loader: Optional[Callable[[], List[dict]]] = None) -> 'Ticket':
+        """Build ticket; message history stays as dicts until first accessed"""
+        ticket = Ticket(
             ticket_id=data["id"],
             user_id=data["user_id"],
             created_at=datetime.fromisoformat(data["created_at"]),
             status=data["status"],
-            messages=[Message.from_dict(m) for m in data["messages"]],
+            messages=None,
             assigned=data.get("assigned"),
             last_actor=data.get("last_actor"),
             last_activity_at=datetime.fromisoformat(data["last_activity_at"]) if data.get("last_activity_at") else None,
@@ -93,5 +263,19 @@ class Ticket:
             feedback_invited=data.get("feedback_invited", False),
             review_received=data.get("review_received", False),
             suggestion_received=data.get("suggestion_received", False),
-            username=data.get("username")
+            username=data.get("username"),
+            version=data.get("version", 0)
         )
+        if messages_loader is not None:
+            ticket._raw_messages = messages_loader
+        else:
+            ticket._raw_messages = _pack_raw_messages(data["messages"])
+        return ticket
+
+
+class TicketPage(NamedTuple):
+    """One page of a ticket listing (newest first) with cursors of its neighbours"""
+    tickets: List[Ticket]
+    total: int
+    newer: Optional[str]  # cursor for get_tickets_page(..., newer=True), None on first page
+    older: Optional[str]  # cursor for the next (older) page, None on last page
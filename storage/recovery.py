@@ -0,0 +1,101 @@
+"""
+Recovery of damaged storage files
+
+When a data file can't be decoded it is never silently replaced: the
+damaged file is moved aside, and the newest decodable copy is used from
+(in order) the previous snapshot (<file>.bak), an unfinished snapshot
+(<file>.tmp), and backup archives in BACKUP_DIR, newest first.
+"""
+
+import os
+import tarfile
+import logging
+from datetime import datetime
+from typing import Callable, Optional, Tuple
+from storage import serializers
+from config import BACKUP_DIR, BACKUP_FILE_PREFIX
+
+logger = logging.getLogger(__name__)
+
+
+class RecoveryError(Exception):
+    """No usable copy of a damaged file was found"""
+
+
+def keep_damaged(path: str) -> Optional[str]:
+    """
+    Move damaged file aside so nothing overwrites it
+
+    Moved, not copied: the next save would otherwise keep the damaged file
+    as <file>.bak in place of the good copy it was just recovered from.
+    """
+    if not os.path.exists(path):
+        return None
+    damaged_path = f"{path}.damaged-{datetime.now().strftime('%Y%m%d-%H%M%S')}"
+    os.replace(path, damaged_path)
+    logger.warning(f"Damaged file kept as {damaged_path}")
+    return damaged_path
+
+
+def _list_backups() -> list:
+    """
+    Backup archives, newest first
+
+    Same as backup_service.list_backups(), which can't be imported while
+    storage is loading (services import the data_manager instance).
+    """
+    if not os.path.isdir(BACKUP_DIR):
+        return []
+    return sorted((name for name in os.listdir(BACKUP_DIR) if name.startswith(BACKUP_FILE_PREFIX)), reverse=True)
+
+
+def _from_backups(rel_name: str, loads: Callable[[bytes], dict]) -> Tuple[dict, str]:
+    """Decode file from newest backup archive that has a good copy"""
+    # Files backups store paths relative to DATA_DIR, full backups under the project dir
+    suffix = "/" + rel_name
+    for name in _list_backups():
+        backup_path = os.path.join(BACKUP_DIR, name)
+        try:
+            with tarfile.open(backup_path, "r:gz") as tar:
+                member = next(
+                    (m for m in tar.getmembers() if m.isfile() and (m.name == rel_name or m.name.endswith(suffix))),
+                    None
+                )
+                if member is None:
+                    continue
+                data = loads(tar.extractfile(member).read())
+            return data, f"backup {name}"
+        except Exception as e:
+            logger.warning(f"Backup {name} has no usable {rel_name}: {e}")
+    raise RecoveryError(f"No usable copy of {rel_name} found")
+
+
+def recover_file(path: str, rel_name: str, loads: Callable[[bytes], dict] = serializers.loads) -> Tuple[dict, str]:
+    """
+    Keep damaged file and decode best fallback copy
+
+    Returns (data, description of what was done) or raises RecoveryError.
+    """
+    damaged_path = keep_damaged(path)
+    kept = f", damaged copy kept as {os.path.basename(damaged_path)}" if damaged_path else ""
+
+    # Newest local snapshot first
+    candidates = [p for p in (path + ".bak", path + ".tmp") if os.path.exists(p)]
+    candidates.sort(key=os.path.getmtime, reverse=True)
+    for candidate in candidates:
+        try:
+            with open(candidate, "rb") as f:
+                data = loads(f.read())
+            source = os.path.basename(candidate)
+            break
+        except Exception as e:
+            logger.warning(f"Fallback {candidate} is not usable: {e}")
+    else:
+        try:
+            data, source = _from_backups(rel_name, loads)
+        except RecoveryError:
+            raise RecoveryError(f"{rel_name}: no usable copy found{kept}")
+
+    note = f"{rel_name}: restored from {source}{kept}"
+    logger.warning(note)
+    return data, note
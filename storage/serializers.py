@@ -0,0 +1,85 @@
+"""
+Serialization of DataManager snapshots (data.json)
+
+Supported formats (DATA_FORMAT):
+    json    - compact JSON via stdlib (always available)
+    orjson  - same JSON, encoded/decoded by orjson (much faster, optional)
+    msgpack - binary MessagePack (smallest, optional)
+
+The format of an existing file is detected on load, so switching
+DATA_FORMAT never requires manual migration. Every snapshot carries a
+"schema" key with SCHEMA_VERSION.
+"""
+
+import json
+import logging
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_VERSION = 1
+
+FORMATS = ("json", "orjson", "msgpack")
+
+# File extension of data written in each format
+EXTENSIONS = {"json": ".json", "orjson": ".json", "msgpack": ".msgpack"}
+
+
+def available_format(fmt: str) -> str:
+    """Requested format, or json if its library is not installed"""
+    if fmt == "orjson" and orjson is None:
+        logger.warning("DATA_FORMAT=orjson but orjson is not installed, using json")
+        return "json"
+    if fmt == "msgpack" and msgpack is None:
+        logger.warning("DATA_FORMAT=msgpack but msgpack is not installed, using json")
+        return "json"
+    return fmt
+
+
+def detect_format(raw: bytes) -> str:
+    """Detect format of stored snapshot by its first byte"""
+    stripped = raw.lstrip()
+    if not stripped or stripped[:1] == b"{":
+        return "json"
+    return "msgpack"
+
+
+def dumps(data: dict, fmt: str) -> bytes:
+    """Encode snapshot with schema header"""
+    data = {"schema": SCHEMA_VERSION, **data}
+    if fmt == "orjson":
+        return orjson.dumps(data)
+    if fmt == "msgpack":
+        return msgpack.packb(data, use_bin_type=True)
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def loads(raw: bytes) -> dict:
+    """Decode snapshot in any supported format"""
+    if raw.startswith(b"\xef\xbb\xbf"):
+        raw = raw[3:]
+
+    fmt = detect_format(raw)
+    if fmt == "msgpack":
+        if msgpack is None:
+            raise RuntimeError("Data file is in msgpack format but msgpack is not installed")
+        data = msgpack.unpackb(raw, raw=False, strict_map_key=False)
+    elif orjson is not None:
+        data = orjson.loads(raw)
+    else:
+        data = json.loads(raw.decode("utf-8"))
+
+    # Files written before the header was introduced have no "schema" key
+    schema = data.pop("schema", 0)
+    if schema > SCHEMA_VERSION:
+        logger.warning(f"Data file schema {schema} is newer than supported {SCHEMA_VERSION}")
+    return data
@@ -0,0 +1,165 @@
+"""
+Sharded on-disk layout for DataManager (DATA_LAYOUT=sharded)
+
+    shards/manifest.json       - shard list, sequences, counters (written last)
+    shards/users.json          - user data
+    shards/tickets-YYYYMM.json - tickets created in that month
+
+A save rewrites only the shards that changed, and damage to one file
+loses at most one month. Files use DATA_FORMAT like data.json.
+"""
+
+import os
+import shutil
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+from storage import serializers
+from storage.recovery import RecoveryError
+
+logger = logging.getLogger(__name__)
+
+LOAD_WORKERS = 4
+
+
+def shard_key(ticket_id: str) -> str:
+    """Shard of ticket by creation month from ID (T-YYYYMMDD-NNNN)"""
+    parts = ticket_id.split("-")
+    return parts[1][:6] if len(parts) == 3 and parts[1].isdigit() else "other"
+
+
+def write_file_atomic(path: str, payload: bytes, keep_previous: bool = False):
+    """Write to temp file, fsync and atomically replace target"""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(payload)
+        f.flush()
+        os.fsync(f.fileno())
+
+    if keep_previous and os.path.exists(path):
+        # Previous snapshot stays as <path>.bak for recovery (hard link - no copying)
+        try:
+            os.link(path, path + ".bak.tmp")
+            os.replace(path + ".bak.tmp", path + ".bak")
+        except OSError as e:
+            logger.debug(f"Could not keep previous copy of {path}: {e}")
+    os.replace(tmp_path, path)
+
+    # Persist the rename itself
+    try:
+        dir_fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+    except OSError:
+        pass
+
+
+class ShardStore:
+    """Per-month ticket files plus users file and manifest"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.manifest_path = os.path.join(directory, "manifest.json")
+        self.users_path = os.path.join(directory, "users.json")
+
+    def has_manifest(self) -> bool:
+        """Check if manifest (or its previous copy) is on disk"""
+        return os.path.exists(self.manifest_path) or os.path.exists(self.manifest_path + ".bak")
+
+    def exists(self) -> bool:
+        """Check if sharded data was written before (even if its manifest is lost)"""
+        if self.has_manifest() or os.path.exists(self.users_path):
+            return True
+        return os.path.isdir(self.directory) and bool(self._keys_on_disk())
+
+    def _shard_path(self, key: str, directory: Optional[str] = None) -> str:
+        return os.path.join(directory or self.directory, f"tickets-{key}.json")
+
+    def _keys_on_disk(self) -> list:
+        """Shard keys from file names (when manifest is lost)"""
+        return [
+            name[len("tickets-"):-len(".json")] for name in os.listdir(self.directory)
+            if name.startswith("tickets-") and name.endswith(".json")
+        ]
+
+    def load(self, on_entry: Callable[[str, str, object], None], read: Callable[[str], dict]) -> dict:
+        """
+        Read all shards (in parallel) calling on_entry(section, key, value)
+
+        read(path) decodes one file and raises RecoveryError if it's damaged
+        beyond repair; such shards are skipped (their damaged copy is kept).
+        Returns manifest sections (sequences, counters), empty if the
+        manifest is lost and shards were found by file name instead.
+        """
+        manifest = {}
+        if self.has_manifest():
+            try:
+                manifest = read(self.manifest_path)
+            except RecoveryError:
+                manifest = {}
+        else:
+            logger.error(f"{self.manifest_path} is missing, loading shards found on disk")
+
+        if "shards" in manifest:
+            keys = sorted(manifest.pop("shards"))
+        else:
+            keys = sorted(self._keys_on_disk())
+
+        def read_shard(key: str) -> dict:
+            try:
+                return read(self._shard_path(key))
+            except RecoveryError:
+                return {}
+
+        # File reads and decoding overlap in worker threads; models are built here
+        with ThreadPoolExecutor(max_workers=LOAD_WORKERS) as pool:
+            shards = pool.map(read_shard, keys)
+            for done, tickets in enumerate(shards, start=1):
+                for ticket_id, data in tickets.items():
+                    on_entry("tickets", ticket_id, data)
+                logger.debug(f"Loaded shard {done}/{len(keys)}")
+
+        if os.path.exists(self.users_path) or os.path.exists(self.users_path + ".bak"):
+            try:
+                users = read(self.users_path)
+            except RecoveryError:
+                users = {}
+            for user_id, data in users.items():
+                on_entry("users", user_id, data)
+
+        return manifest
+
+    def write(self, shards: Dict[str, dict], users: Optional[dict], manifest: dict, fmt: str):
+        """Rewrite changed shards (empty ones are removed), users and manifest"""
+        if os.path.isdir(self.directory) and not os.listdir(self.directory):
+            os.rmdir(self.directory)
+        if os.path.isdir(self.directory):
+            self._write_files(self.directory, shards, users, manifest, fmt)
+            return
+
+        # First write (data.json being split): build the directory aside and move it
+        # in at once, so shard files on disk always hold the whole data
+        staging = self.directory + ".tmp"
+        shutil.rmtree(staging, ignore_errors=True)
+        self._write_files(staging, shards, users, manifest, fmt)
+        os.replace(staging, self.directory)
+
+    def _write_files(self, directory: str, shards: Dict[str, dict], users: Optional[dict], manifest: dict, fmt: str):
+        os.makedirs(directory, exist_ok=True)
+
+        for key, tickets in shards.items():
+            path = self._shard_path(key, directory)
+            if tickets:
+                write_file_atomic(path, serializers.dumps(tickets, fmt), keep_previous=True)
+            elif os.path.exists(path):
+                os.remove(path)
+
+        if users is not None:
+            users_path = os.path.join(directory, os.path.basename(self.users_path))
+            write_file_atomic(users_path, serializers.dumps(users, fmt), keep_previous=True)
+
+        # Manifest goes last - it only lists shards that are fully written
+        manifest_path = os.path.join(directory, os.path.basename(self.manifest_path))
+        write_file_atomic(manifest_path, serializers.dumps(manifest, fmt), keep_previous=True)
@@ -0,0 +1,647 @@
+"""
+SQLite storage backend
+
+Drop-in replacement for DataManager that keeps tickets, messages and users
+in an embedded SQLite database. Only the rows a caller asks for are read,
+and every mutation writes just the affected rows.
+"""
+
+import json
+import os
+import asyncio
+import sqlite3
+import logging
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Mapping, Optional
+from storage.models import Ticket, TicketConflictError, TicketPage, ACTIVE_STATUSES, DEFAULT_USER_DATA
+from storage.id_index import TicketIdIndex
+from storage.timeline import encode_cursor, decode_cursor
+from config import SHARDS_DIR, SQLITE_FILE
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_VERSION = 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tickets (
+    id TEXT PRIMARY KEY,
+    user_id INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    created_ts REAL NOT NULL,
+    assigned INTEGER,
+    last_actor TEXT,
+    last_activity_at TEXT,
+    first_response_at TEXT,
+    rated INTEGER NOT NULL DEFAULT 0,
+    rating TEXT,
+    feedback_invited INTEGER NOT NULL DEFAULT 0,
+    review_received INTEGER NOT NULL DEFAULT 0,
+    suggestion_received INTEGER NOT NULL DEFAULT 0,
+    username TEXT,
+    version INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_tickets_user_status ON tickets(user_id, status);
+-- (created_ts, id) is the inbox sort key, id breaks ties between equal timestamps
+CREATE INDEX IF NOT EXISTS idx_tickets_status_created_id ON tickets(status, created_ts, id);
+CREATE INDEX IF NOT EXISTS idx_tickets_created_id ON tickets(created_ts, id);
+
+CREATE TABLE IF NOT EXISTS messages (
+    ticket_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    sender TEXT NOT NULL,
+    text TEXT,
+    at TEXT NOT NULL,
+    PRIMARY KEY (ticket_id, seq)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS users (
+    user_id TEXT PRIMARY KEY,
+    data TEXT NOT NULL
+);
+
+-- One-off facts about the database itself, e.g. 'json_imported' once JSON data was copied in
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS sequences (
+    day TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+
+-- Live counters for get_stats(), kept by triggers: '*users' + one row per ticket status
+CREATE TABLE IF NOT EXISTS counters (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+
+CREATE TRIGGER IF NOT EXISTS trg_tickets_insert AFTER INSERT ON tickets BEGIN
+    INSERT INTO counters (name, value) VALUES (NEW.status, 1)
+        ON CONFLICT(name) DO UPDATE SET value = value + 1;
+END;
+CREATE TRIGGER IF NOT EXISTS trg_tickets_delete AFTER DELETE ON tickets BEGIN
+    UPDATE counters SET value = value - 1 WHERE name = OLD.status;
+END;
+CREATE TRIGGER IF NOT EXISTS trg_tickets_status AFTER UPDATE OF status ON tickets
+WHEN OLD.status != NEW.status BEGIN
+    UPDATE counters SET value = value - 1 WHERE name = OLD.status;
+    INSERT INTO counters (name, value) VALUES (NEW.status, 1)
+        ON CONFLICT(name) DO UPDATE SET value = value + 1;
+END;
+CREATE TRIGGER IF NOT EXISTS trg_users_insert AFTER INSERT ON users BEGIN
+    INSERT INTO counters (name, value) VALUES ('*users', 1)
+        ON CONFLICT(name) DO UPDATE SET value = value + 1;
+END;
+CREATE TRIGGER IF NOT EXISTS trg_users_delete AFTER DELETE ON users BEGIN
+    UPDATE counters SET value = value - 1 WHERE name = '*users';
+END;
+"""
+
+USERS_COUNTER = "*users"
+
+# meta row written together with the imported data
+IMPORTED_KEY = "json_imported"
+
+TICKET_COLUMNS = (
+    "id", "user_id", "status", "created_at", "created_ts", "assigned",
+    "last_actor", "last_activity_at", "first_response_at", "rated", "rating",
+    "feedback_invited", "review_received", "suggestion_received", "username", "version"
+)
+
+
+class SQLiteDataManager:
+    """DataManager-compatible storage backed by SQLite"""
+
+    def __init__(self, path: str = SQLITE_FILE):
+        self.path = path
+        self.conn = None
+        # Kept for API parity with DataManager - SQLite recovers from its own WAL
+        self.recovery: List[str] = []
+        self._in_batch = False
+        # Callbacks of the open batch, run after it commits
+        self._on_commit: List[Callable[[], None]] = []
+        # Writes done and skipped because nothing changed (same as DataManager)
+        self.write_stats = {"performed": 0, "skipped": 0}
+        # Sorted ticket ids in memory: suffix lookups ("0412") can't use the primary key
+        self._ticket_ids = TicketIdIndex()
+        self.load()
+
+    def load(self):
+        """Open database, create schema and import data.json until an import has completed"""
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self.conn.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+        self.conn.commit()
+
+        if self._get_meta(IMPORTED_KEY) is None:
+            self._import_json()
+
+        self._verify_counters()
+        self._ticket_ids = TicketIdIndex(row[0] for row in self.conn.execute("SELECT id FROM tickets"))
+
+        stats = self.get_stats()
+        logger.info(f"SQLite storage opened: {stats['total_tickets']} tickets and {stats['total_users']} users")
+
+    def _get_meta(self, key: str) -> Optional[str]:
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _import_json(self):
+        """
+        One-time migration of existing data.json (journal, archive) into the database
+
+        The import is marked done in the same transaction that copies the
+        data, so after a crash it is simply redone on next start.
+        """
+        from storage.data_manager import DataManager
+        from storage.shards import ShardStore
+
+        if not DataManager.has_stored_data():
+            with self.conn:
+                self.conn.execute("INSERT INTO meta (key, value) VALUES (?, ?)", (IMPORTED_KEY, "none"))
+            return
+
+        # Shards are read whatever DATA_LAYOUT says now - they are newer than data.json
+        layout = "sharded" if ShardStore(SHARDS_DIR).exists() else "single"
+        logger.info(f"Importing {layout} JSON data into {self.path}")
+        source = DataManager(layout)
+        with self.conn:
+            # Leftovers of an import that was not marked done
+            for table in ("messages", "tickets", "users", "sequences"):
+                self.conn.execute(f"DELETE FROM {table}")
+            for ticket in source.get_all_tickets():
+                self._insert_ticket(ticket)
+            for ticket in source.archive.iter_tickets():
+                self._insert_ticket(ticket)
+            for user_id_str, user_data in source.data["users"].items():
+                self.conn.execute(
+                    "INSERT INTO users (user_id, data) VALUES (?, ?)",
+                    (user_id_str, json.dumps(user_data, ensure_ascii=False))
+                )
+            # Numbers of deleted tickets are not handed out again
+            self.conn.executemany(
+                "INSERT INTO sequences (day, value) VALUES (?, ?)", source._sequences.items()
+            )
+            self.conn.execute("INSERT INTO meta (key, value) VALUES (?, ?)", (IMPORTED_KEY, layout))
+        source.journal.close()
+        logger.info(
+            f"Imported {len(source.data['tickets'])} tickets ({len(source.archive)} archived) "
+            f"and {len(source.data['users'])} users"
+        )
+
+    def save(self):
+        """Flush pending changes (every mutation is already committed)"""
+        try:
+            self.conn.commit()
+            logger.debug("Data saved successfully")
+        except Exception as e:
+            logger.error(f"Error saving data: {e}", exc_info=True)
+
+    async def save_async(self):
+        """Same as save() - commits are row-sized and don't need a worker thread"""
+        self.save()
+
+    async def flush_async(self):
+        """Same as save()"""
+        self.save()
+
+    def _checkpoint(self):
+        """Copy WAL into the database file and truncate it"""
+        # Own connection - the main one stays free for the event loop
+        conn = sqlite3.connect(self.path)
+        try:
+            busy, log_pages, moved = conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchone()
+        finally:
+            conn.close()
+        if busy:
+            logger.warning("WAL checkpoint could not finish, will retry on next compaction")
+        else:
+            logger.info(f"Storage compacted: {moved} WAL pages checkpointed")
+
+    async def compact_async(self):
+        """Checkpoint WAL in a worker thread so it doesn't grow without bound"""
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.run_in_executor(None, self._checkpoint)
+        except Exception as e:
+            logger.error(f"Error compacting storage: {e}", exc_info=True)
+
+    # ========== BATCH ==========
+
+    @contextmanager
+    def batch(self):
+        """Run several writes in one transaction, rolled back on exception"""
+        if self._in_batch:
+            # Nested batch joins the outer one
+            yield
+            return
+
+        self.conn.execute("BEGIN")
+        self._in_batch = True
+        try:
+            yield
+        except BaseException:
+            self.conn.rollback()
+            logger.warning("Batch rolled back")
+            raise
+        else:
+            self.conn.commit()
+        finally:
+            self._in_batch = False
+            # Dropped on rollback (the raise above skips the loop below)
+            callbacks, self._on_commit = self._on_commit, []
+        for callback in callbacks:
+            callback()
+
+    def on_commit(self, callback: Callable[[], None]):
+        """Run callback once current changes are committed (right away outside batch())"""
+        if self._in_batch:
+            self._on_commit.append(callback)
+        else:
+            callback()
+
+    @contextmanager
+    def _transaction(self):
+        """Transaction for one write (a savepoint inside batch())"""
+        if not self._in_batch:
+            with self.conn:
+                yield
+            return
+
+        self.conn.execute("SAVEPOINT write")
+        try:
+            yield
+        except BaseException:
+            self.conn.execute("ROLLBACK TO write")
+            raise
+        finally:
+            self.conn.execute("RELEASE write")
+
+    # ========== TICKET ID SEQUENCE ==========
+
+    def next_ticket_number(self, day: str) -> int:
+        """Hand out next ticket number for day (YYYYMMDD)"""
+        with self._transaction():
+            row = self.conn.execute("SELECT value FROM sequences WHERE day = ?", (day,)).fetchone()
+            if row:
+                num = row["value"] + 1
+            else:
+                # First ticket of the day or pre-sequence data - recover from existing IDs
+                last_id = self.conn.execute(
+                    "SELECT MAX(id) FROM tickets WHERE id LIKE ?", (f"T-{day}-%",)
+                ).fetchone()[0]
+                num = int(last_id.split("-")[-1]) + 1 if last_id else 1
+            self.conn.execute(
+                "INSERT OR REPLACE INTO sequences (day, value) VALUES (?, ?)", (day, num)
+            )
+        return num
+
+    # ========== TICKETS ==========
+
+    def _ticket_row(self, ticket: Ticket) -> tuple:
+        """Convert ticket to tickets table row"""
+        data = ticket.to_dict()
+        return (
+            data["id"], data["user_id"], data["status"], data["created_at"],
+            ticket.created_at.timestamp(), data["assigned"], data["last_actor"],
+            data["last_activity_at"], data["first_response_at"], int(data["rated"]),
+            data["rating"], int(data["feedback_invited"]), int(data["review_received"]),
+            int(data["suggestion_received"]), data["username"], data["version"]
+        )
+
+    def _insert_ticket(self, ticket: Ticket):
+        """Insert ticket row and all its messages"""
+        # Plain INSERT: REPLACE would bypass the delete counter trigger
+        placeholders = ", ".join("?" for _ in TICKET_COLUMNS)
+        self.conn.execute(
+            f"INSERT INTO tickets ({', '.join(TICKET_COLUMNS)}) VALUES ({placeholders})",
+            self._ticket_row(ticket)
+        )
+        self._sync_messages(ticket, stored_count=0)
+
+    def _sync_messages(self, ticket: Ticket, stored_count: int):
+        """Write messages that are not yet in the database"""
+        if stored_count > len(ticket.messages):
+            self.conn.execute(
+                "DELETE FROM messages WHERE ticket_id = ? AND seq >= ?",
+                (ticket.id, len(ticket.messages))
+            )
+            return
+
+        new_rows = [
+            (ticket.id, seq, m.sender, m.text, m.at.isoformat())
+            for seq, m in enumerate(ticket.messages[stored_count:], start=stored_count)
+        ]
+        if new_rows:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO messages (ticket_id, seq, sender, text, at) VALUES (?, ?, ?, ?, ?)",
+                new_rows
+            )
+
+    def _row_to_ticket(self, row: sqlite3.Row) -> Ticket:
+        """Build Ticket object from tickets row (messages are queried on first access)"""
+        ticket_id = row["id"]
+
+        def load_messages() -> List[dict]:
+            return [
+                {"sender": m["sender"], "text": m["text"], "at": m["at"]}
+                for m in self.conn.execute(
+                    "SELECT sender, text, at FROM messages WHERE ticket_id = ? ORDER BY seq",
+                    (ticket_id,)
+                )
+            ]
+
+        return Ticket.from_dict({
+            "id": ticket_id,
+            "user_id": row["user_id"],
+            "created_at": row["created_at"],
+            "status": row["status"],
+            "assigned": row["assigned"],
+            "last_actor": row["last_actor"],
+            "last_activity_at": row["last_activity_at"],
+            "first_response_at": row["first_response_at"],
+            "rated": bool(row["rated"]),
+            "rating": row["rating"],
+            "feedback_invited": bool(row["feedback_invited"]),
+            "review_received": bool(row["review_received"]),
+            "suggestion_received": bool(row["suggestion_received"]),
+            "username": row["username"],
+            "version": row["version"]
+        }, messages_loader=load_messages)
+
+    def _query_tickets(self, where: str = "", params: tuple = ()) -> List[Ticket]:
+        """Run SELECT over tickets table and build Ticket objects"""
+        rows = self.conn.execute(f"SELECT * FROM tickets {where}", params).fetchall()
+        return [self._row_to_ticket(row) for row in rows]
+
+    def get_ticket(self, ticket_id: str) -> Optional[Ticket]:
+        """Get ticket by ID"""
+        row = self.conn.execute("SELECT * FROM tickets WHERE id = ?", (ticket_id,)).fetchone()
+        return self._row_to_ticket(row) if row else None
+
+    def match_ticket_ids(self, fragment: str, limit: int = 10) -> List[str]:
+        """IDs starting or ending with fragment, newest first (no row is read)"""
+        return self._ticket_ids.match(fragment, limit)
+
+    def find_tickets(self, fragment: str, limit: int = 10) -> List[Ticket]:
+        """Tickets whose ID starts or ends with fragment ("20251110-00", "0412"), newest first"""
+        tickets = [self.get_ticket(ticket_id) for ticket_id in self.match_ticket_ids(fragment, limit)]
+        # Ids of tickets created in a rolled back batch are skipped here
+        return [ticket for ticket in tickets if ticket is not None]
+
+    def find_ticket(self, fragment: str) -> Optional[Ticket]:
+        """Find ticket whose ID contains fragment"""
+        tickets = self.find_tickets(fragment, 1)
+        if not tickets:
+            # Fragment from the middle of an ID - scan
+            tickets = self._query_tickets("WHERE instr(id, ?) > 0 LIMIT 1", (fragment,))
+        return tickets[0] if tickets else None
+
+    def create_ticket(self, ticket: Ticket):
+        """Create new ticket"""
+        try:
+            with self._transaction():
+                self._insert_ticket(ticket)
+            self._ticket_ids.add(ticket.id)
+            self.write_stats["performed"] += 1
+        except Exception as e:
+            logger.error(f"Error creating ticket {ticket.id}: {e}", exc_info=True)
+
+    def update_ticket(self, ticket: Ticket, expected_version: Optional[int] = None):
+        """
+        Update existing ticket
+
+        With expected_version the update is a compare-and-set: it raises
+        TicketConflictError if the stored row has another version.
+        """
+        try:
+            with self._transaction():
+                current = self.conn.execute(
+                    f"SELECT {', '.join(TICKET_COLUMNS)} FROM tickets WHERE id = ?", (ticket.id,)
+                ).fetchone()
+                if current is None:
+                    return
+                version = current["version"] if expected_version is None else expected_version
+                if current["version"] != version:
+                    raise TicketConflictError(
+                        f"Ticket {ticket.id} is at version {current['version']}, expected {version}"
+                    )
+
+                row = self._ticket_row(ticket)
+                # History never decoded can't have new messages
+                stored_count = None
+                if ticket.messages_loaded:
+                    stored_count = self.conn.execute(
+                        "SELECT COUNT(*) FROM messages WHERE ticket_id = ?", (ticket.id,)
+                    ).fetchone()[0]
+
+                # Version is not content - compared above
+                if tuple(current)[1:-1] == row[1:-1] and stored_count in (None, len(ticket.messages)):
+                    # Nothing changed - no write and no commit to the WAL
+                    self.write_stats["skipped"] += 1
+                    return
+
+                assignments = ", ".join(f"{col} = ?" for col in TICKET_COLUMNS[1:-1])
+                cursor = self.conn.execute(
+                    f"UPDATE tickets SET {assignments}, version = version + 1 WHERE id = ? AND version = ?",
+                    row[1:-1] + (ticket.id, version)
+                )
+                if cursor.rowcount != 1:
+                    raise TicketConflictError(f"Ticket {ticket.id} changed while being updated")
+                if stored_count is not None:
+                    self._sync_messages(ticket, stored_count)
+            ticket.version = version + 1
+            self.write_stats["performed"] += 1
+        except TicketConflictError:
+            raise
+        except Exception as e:
+            logger.error(f"Error updating ticket {ticket.id}: {e}", exc_info=True)
+
+    def delete_ticket(self, ticket_id: str):
+        """Delete ticket"""
+        try:
+            with self._transaction():
+                self.conn.execute("DELETE FROM messages WHERE ticket_id = ?", (ticket_id,))
+                self.conn.execute("DELETE FROM tickets WHERE id = ?", (ticket_id,))
+            self._ticket_ids.remove(ticket_id)
+            self.write_stats["performed"] += 1
+        except Exception as e:
+            logger.error(f"Error deleting ticket {ticket_id}: {e}", exc_info=True)
+
+    def get_all_tickets(self) -> List[Ticket]:
+        """Get all tickets"""
+        return self._query_tickets()
+
+    def get_message_counts(self) -> Dict[str, int]:
+        """Number of messages of each ticket in one query"""
+        rows = self.conn.execute(
+            "SELECT tickets.id, COUNT(messages.seq) FROM tickets "
+            "LEFT JOIN messages ON messages.ticket_id = tickets.id GROUP BY tickets.id"
+        )
+        return {ticket_id: count for ticket_id, count in rows}
+
+    def get_tickets_by_status(self, status: str) -> List[Ticket]:
+        """Get tickets by status"""
+        return self._query_tickets("WHERE status = ?", (status,))
+
+    def get_active_tickets(self) -> List[Ticket]:
+        """Get all active tickets (new or working)"""
+        placeholders = ", ".join("?" for _ in ACTIVE_STATUSES)
+        return self._query_tickets(f"WHERE status IN ({placeholders})", ACTIVE_STATUSES)
+
+    def get_tickets_page(
+        self,
+        status: Optional[str] = None,
+        cursor: Optional[str] = None,
+        limit: int = 10,
+        newer: bool = False
+    ) -> TicketPage:
+        """One page of tickets, newest first (same contract as DataManager.get_tickets_page)"""
+        status_filter, status_params = ("status = ? AND ", (status,)) if status is not None else ("", ())
+
+        tickets = []
+        if cursor is not None:
+            stamp, ticket_id = decode_cursor(cursor)
+            if newer:
+                tickets = self._query_tickets(
+                    f"WHERE {status_filter}(created_ts, id) > (?, ?) ORDER BY created_ts, id LIMIT ?",
+                    status_params + (stamp, ticket_id, limit)
+                )
+                tickets.reverse()
+            else:
+                tickets = self._query_tickets(
+                    f"WHERE {status_filter}(created_ts, id) < (?, ?) ORDER BY created_ts DESC, id DESC LIMIT ?",
+                    status_params + (stamp, ticket_id, limit)
+                )
+        if cursor is None or (newer and len(tickets) < limit):
+            # Newest page (also when paging up reaches the top)
+            tickets = self._query_tickets(
+                f"WHERE {status_filter}1 ORDER BY created_ts DESC, id DESC LIMIT ?",
+                status_params + (limit,)
+            )
+
+        # Totals come from the trigger-maintained counters, not COUNT(*)
+        counts = dict(self.conn.execute("SELECT name, value FROM counters").fetchall())
+        counts.pop(USERS_COUNTER, None)
+        total = counts.get(status, 0) if status is not None else sum(counts.values())
+
+        def neighbour(ticket: Ticket, op: str) -> Optional[str]:
+            key = (ticket.created_at.timestamp(), ticket.id)
+            exists = self.conn.execute(
+                f"SELECT 1 FROM tickets WHERE {status_filter}(created_ts, id) {op} (?, ?) LIMIT 1",
+                status_params + key
+            ).fetchone()
+            return encode_cursor(*key) if exists else None
+
+        if not tickets:
+            return TicketPage([], total, None, None)
+        return TicketPage(tickets, total, neighbour(tickets[0], ">"), neighbour(tickets[-1], "<"))
+
+    def get_user_tickets(self, user_id: int) -> List[Ticket]:
+        """Get all tickets of user"""
+        return self._query_tickets("WHERE user_id = ?", (user_id,))
+
+    def get_user_ticket_ids(self, user_id: int) -> List[str]:
+        """IDs of all tickets of user, newest first (no row is built into a ticket)"""
+        rows = self.conn.execute("SELECT id FROM tickets WHERE user_id = ? ORDER BY id DESC", (user_id,))
+        return [row[0] for row in rows]
+
+    def get_ticket_users(self, after: Optional[str] = None) -> List[tuple]:
+        """(ticket_id, user_id, username) of tickets created after ticket id, in one query"""
+        rows = self.conn.execute(
+            "SELECT id, user_id, username FROM tickets WHERE id > ? ORDER BY id", (after or "",)
+        )
+        return [tuple(row) for row in rows]
+
+    def get_user_active_ticket(self, user_id: int) -> Optional[Ticket]:
+        """Get user's most recent active ticket"""
+        placeholders = ", ".join("?" for _ in ACTIVE_STATUSES)
+        tickets = self._query_tickets(
+            f"WHERE user_id = ? AND status IN ({placeholders}) ORDER BY created_ts DESC LIMIT 1",
+            (user_id,) + ACTIVE_STATUSES
+        )
+        return tickets[0] if tickets else None
+
+    # ========== ARCHIVE ==========
+
+    async def archive_closed_tickets_async(self, after_days: int) -> int:
+        """Closed tickets stay on disk in SQLite - nothing to move out of memory"""
+        return 0
+
+    # ========== USERS ==========
+
+    def peek_user_data(self, user_id: int) -> Mapping:
+        """Read-only lookup of user data (defaults for unknown users, nothing is stored)"""
+        row = self.conn.execute("SELECT data FROM users WHERE user_id = ?", (str(user_id),)).fetchone()
+        return json.loads(row["data"]) if row else DEFAULT_USER_DATA
+
+    def get_user_data(self, user_id: int) -> dict:
+        """Copy of user data (changes are stored only by update_user_data)"""
+        return dict(self.peek_user_data(user_id))
+
+    def get_user_locale(self, user_id: int) -> Optional[str]:
+        """Saved locale of user (None if not set)"""
+        row = self.conn.execute(
+            "SELECT json_extract(data, '$.locale') FROM users WHERE user_id = ?", (str(user_id),)
+        ).fetchone()
+        return row[0] if row else None
+
+    def update_user_data(self, user_id: int, updates: dict):
+        """Update user data"""
+        user_id_str = str(user_id)
+        try:
+            with self._transaction():
+                row = self.conn.execute("SELECT data FROM users WHERE user_id = ?", (user_id_str,)).fetchone()
+                user_data = json.loads(row["data"]) if row else dict(DEFAULT_USER_DATA)
+                user_data.update(updates)
+                data = json.dumps(user_data, ensure_ascii=False)
+                if row and data == row["data"]:
+                    # E.g. same locale chosen again
+                    self.write_stats["skipped"] += 1
+                    return
+                self.conn.execute(
+                    "INSERT INTO users (user_id, data) VALUES (?, ?) "
+                    "ON CONFLICT(user_id) DO UPDATE SET data = excluded.data",
+                    (user_id_str, data)
+                )
+            self.write_stats["performed"] += 1
+        except Exception as e:
+            logger.error(f"Error updating user {user_id}: {e}", exc_info=True)
+
+    # ========== STATISTICS ==========
+
+    def _recount(self) -> dict:
+        """Count tickets per status and users with full scans"""
+        counts = dict(self.conn.execute("SELECT status, COUNT(*) FROM tickets GROUP BY status").fetchall())
+        counts[USERS_COUNTER] = self.conn.execute("SELECT COUNT(*) FROM users").fetchone()[0]
+        return {name: value for name, value in counts.items() if value}
+
+    def _verify_counters(self):
+        """Compare trigger-maintained counters with a full recount, fix on mismatch"""
+        stored = {
+            name: value for name, value in self.conn.execute("SELECT name, value FROM counters")
+            if value
+        }
+        actual = self._recount()
+        if stored != actual:
+            if stored:
+                logger.warning(f"Stored counters {stored} don't match recount {actual}, using recount")
+            with self.conn:
+                self.conn.execute("DELETE FROM counters")
+                self.conn.executemany("INSERT INTO counters (name, value) VALUES (?, ?)", actual.items())
+
+    def get_stats(self) -> dict:
+        """Get statistics"""
+        counts = dict(self.conn.execute("SELECT name, value FROM counters").fetchall())
+        total_users = counts.pop(USERS_COUNTER, 0)
+        return {
+            "total_users": total_users,
+            "total_tickets": sum(counts.values()),
+            "active_tickets": counts.get("new", 0) + counts.get("working", 0),
+            "closed_tickets": counts.get("done", 0)
+        }
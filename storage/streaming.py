@@ -0,0 +1,188 @@
+"""
+Incremental reader for large data.json snapshots
+
+Instead of decoding the whole file into one dict, entries of the large
+"tickets" and "users" maps are decoded one at a time from a fixed-size
+read buffer and handed to a callback, so peak memory stays close to the
+size of the resulting models. Supports JSON and (if installed) msgpack.
+"""
+
+import codecs
+import json
+import os
+import re
+import logging
+from typing import Callable, Iterator, Tuple
+from storage import serializers
+
+logger = logging.getLogger(__name__)
+
+# Top-level maps streamed entry by entry; other sections are small and read whole
+STREAMED_SECTIONS = ("tickets", "users")
+
+CHUNK_SIZE = 1024 * 1024
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+
+class _JSONReader:
+    """Buffered JSON token reader over a binary file"""
+
+    def __init__(self, f, chunk_size: int = CHUNK_SIZE):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.decoder = json.JSONDecoder()
+        self.utf8 = codecs.getincrementaldecoder("utf-8-sig")()
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+        self.bytes_read = 0
+
+    def _fill(self) -> bool:
+        """Append next chunk to buffer, dropping consumed part"""
+        if self.eof:
+            return False
+        chunk = self.f.read(self.chunk_size)
+        self.bytes_read += len(chunk)
+        if not chunk:
+            self.eof = True
+        self.buf = self.buf[self.pos:] + self.utf8.decode(chunk, final=self.eof)
+        self.pos = 0
+        return not self.eof or bool(self.buf)
+
+    def peek(self) -> str:
+        """Next non-whitespace character (empty string at end of file)"""
+        while True:
+            self.pos = _WHITESPACE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf) or not self._fill():
+                return self.buf[self.pos:self.pos + 1]
+
+    def expect(self, char: str):
+        """Consume expected structural character"""
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"Expected '{char}' at byte ~{self.bytes_read}, found '{found}'")
+        self.pos += 1
+
+    def value(self):
+        """Decode next complete JSON value"""
+        self.peek()
+        while True:
+            try:
+                obj, end = self.decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                # Value continues in the next chunk (or the file is damaged)
+                if not self._fill():
+                    raise
+                continue
+            if end == len(self.buf) and not self.eof:
+                # A number may be cut at the chunk boundary - make sure it's complete
+                self._fill()
+                continue
+            self.pos = end
+            return obj
+
+    def items(self) -> Iterator[Tuple[str, object]]:
+        """Decode object entries one at a time"""
+        self.expect("{")
+        if self.peek() == "}":
+            self.pos += 1
+            return
+        while True:
+            key = self.value()
+            self.expect(":")
+            yield key, self.value()
+            if self.peek() == ",":
+                self.pos += 1
+            else:
+                self.expect("}")
+                return
+
+
+class _Progress:
+    """Log load progress every 10%"""
+
+    def __init__(self, path: str):
+        self.total = os.path.getsize(path) or 1
+        self.next_step = 10
+
+    def update(self, done: int):
+        percent = done * 100 // self.total
+        if percent >= self.next_step:
+            logger.info(f"Loading data: {percent}%")
+            self.next_step = percent // 10 * 10 + 10
+
+
+def stream_snapshot(path: str, on_entry: Callable[[str, str, object], None]) -> dict:
+    """
+    Read snapshot calling on_entry(section, key, value) for every ticket/user
+
+    Returns remaining top-level sections (sequences, counters, ...).
+    """
+    with open(path, "rb") as f:
+        head = f.read(64)
+        f.seek(0)
+        if serializers.detect_format(head.lstrip(b"\xef\xbb\xbf")) == "msgpack":
+            return _stream_msgpack(f, path, on_entry)
+        return _stream_json(f, path, on_entry)
+
+
+def _stream_json(f, path: str, on_entry: Callable[[str, str, object], None]) -> dict:
+    reader = _JSONReader(f)
+    progress = _Progress(path)
+    sections = {}
+
+    for key in _top_level_keys(reader):
+        if key in STREAMED_SECTIONS:
+            for entry_key, entry in reader.items():
+                on_entry(key, entry_key, entry)
+                progress.update(reader.bytes_read)
+        else:
+            sections[key] = reader.value()
+
+    return _check_schema(sections)
+
+
+def _top_level_keys(reader: _JSONReader) -> Iterator[str]:
+    """Walk top-level object yielding keys; caller consumes each value"""
+    reader.expect("{")
+    if reader.peek() == "}":
+        return
+    while True:
+        key = reader.value()
+        reader.expect(":")
+        yield key
+        if reader.peek() == ",":
+            reader.pos += 1
+        else:
+            reader.expect("}")
+            return
+
+
+def _stream_msgpack(f, path: str, on_entry: Callable[[str, str, object], None]) -> dict:
+    if serializers.msgpack is None:
+        raise RuntimeError("Data file is in msgpack format but msgpack is not installed")
+
+    unpacker = serializers.msgpack.Unpacker(f, raw=False, strict_map_key=False, max_buffer_size=0)
+    progress = _Progress(path)
+    sections = {}
+
+    for _ in range(unpacker.read_map_header()):
+        key = unpacker.unpack()
+        if key in STREAMED_SECTIONS:
+            for _ in range(unpacker.read_map_header()):
+                entry_key = unpacker.unpack()
+                on_entry(key, entry_key, unpacker.unpack())
+                progress.update(unpacker.tell())
+        else:
+            sections[key] = unpacker.unpack()
+
+    return _check_schema(sections)
+
+
+def _check_schema(sections: dict) -> dict:
+    """Strip schema header the same way serializers.loads() does"""
+    schema = sections.pop("schema", 0)
+    if schema > serializers.SCHEMA_VERSION:
+        logger.warning(f"Data file schema {schema} is newer than supported {serializers.SCHEMA_VERSION}")
+    return sections
@@ -0,0 +1,98 @@
+"""
+Ticket ids ordered by creation time, for paged listings (admin inbox)
+
+Entries are kept sorted by (created_at timestamp, ticket id) in two parallel
+arrays, so a page is found with a binary search and a slice instead of
+sorting every ticket. Pages are addressed by keyset cursors: the key of the
+last ticket shown, which stays valid while tickets are added or closed.
+"""
+
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import List, Optional, Tuple
+
+
+def encode_cursor(stamp: float, ticket_id: str) -> str:
+    """Cursor for position of ticket in listing (fits Telegram callback data)"""
+    return f"{stamp!r}/{ticket_id}"
+
+
+def decode_cursor(cursor: str) -> Tuple[float, str]:
+    """Split cursor into (timestamp, ticket_id); raises ValueError if malformed"""
+    stamp, _, ticket_id = cursor.partition("/")
+    if not ticket_id:
+        raise ValueError(f"Invalid cursor: {cursor!r}")
+    return float(stamp), ticket_id
+
+
+class Timeline:
+    """Ticket ids sorted by (created_at, id), oldest first"""
+
+    def __init__(self):
+        self._stamps = array("d")
+        self._ids: List[str] = []
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def _position(self, stamp: float, ticket_id: str) -> int:
+        """Index where (stamp, ticket_id) is or would be inserted"""
+        lo = bisect_left(self._stamps, stamp)
+        hi = bisect_right(self._stamps, stamp, lo)
+        # Equal timestamps are ordered by id
+        return bisect_left(self._ids, ticket_id, lo, hi)
+
+    def add(self, stamp: float, ticket_id: str):
+        if not self._ids or (stamp, ticket_id) > (self._stamps[-1], self._ids[-1]):
+            # New tickets (and tickets loaded in order) go to the end
+            self._stamps.append(stamp)
+            self._ids.append(ticket_id)
+            return
+        i = self._position(stamp, ticket_id)
+        if i < len(self._ids) and self._ids[i] == ticket_id and self._stamps[i] == stamp:
+            return
+        self._stamps.insert(i, stamp)
+        self._ids.insert(i, ticket_id)
+
+    def remove(self, stamp: Optional[float], ticket_id: str):
+        """Remove entry (stamp None = look it up by id)"""
+        if stamp is not None:
+            i = self._position(stamp, ticket_id)
+            if i >= len(self._ids) or self._ids[i] != ticket_id:
+                return
+        else:
+            try:
+                i = self._ids.index(ticket_id)
+            except ValueError:
+                return
+        del self._stamps[i]
+        del self._ids[i]
+
+    def page(self, limit: int, cursor: Optional[str] = None, newer: bool = False) -> Tuple[List[str], Optional[str], Optional[str]]:
+        """
+        One page of ids, newest first
+
+        Without cursor returns the newest page. With cursor returns the page
+        older than it (or newer than it with newer=True). Also returns cursors
+        for the newer and older neighbour pages (None at either end).
+        """
+        total = len(self._ids)
+        if cursor is None:
+            end = total
+        else:
+            stamp, ticket_id = decode_cursor(cursor)
+            pos = self._position(stamp, ticket_id)
+            if newer:
+                # Cursor is the newest ticket of the page shown before: skip it
+                if pos < total and self._ids[pos] == ticket_id:
+                    pos += 1
+                end = min(total, pos + limit)
+            else:
+                end = pos
+
+        start = max(0, end - limit)
+        ids = self._ids[start:end]
+        ids.reverse()
+        newer_cursor = encode_cursor(self._stamps[end - 1], self._ids[end - 1]) if end < total and ids else None
+        older_cursor = encode_cursor(self._stamps[start], self._ids[start]) if start > 0 and ids else None
+        return ids, newer_cursor, older_cursor
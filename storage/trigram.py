@@ -0,0 +1,61 @@
+"""
+Trigram index for fuzzy lookups of short strings (usernames, user ids)
+
+Each key is split into 3-character pieces, with "$" marking its start and
+end ("john" -> $jo, joh, ohn, hn$). A query is scored by the share of its
+trigrams found in a key, so a partial name ("joh") scores 1.0 against
+"john_doe" and a typo ("jonh") still shares the "$jo" start.
+"""
+
+from typing import Dict, List, Set, Tuple
+
+
+def trigrams(text: str, closed: bool = True) -> Set[str]:
+    """Trigrams of text; closed=False leaves the end open (text typed so far)"""
+    padded = f"${text}$" if closed else f"${text}"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TrigramIndex:
+    """Keys by trigram, each key mapped to a set of values"""
+
+    def __init__(self):
+        self._keys: Dict[str, Set[int]] = {}
+        self._postings: Dict[str, Set[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def add(self, key: str, value: int):
+        values = self._keys.get(key)
+        if values is None:
+            values = self._keys[key] = set()
+            for gram in trigrams(key):
+                self._postings.setdefault(gram, set()).add(key)
+        values.add(value)
+
+    def search(self, query: str, min_score: float = 0.3) -> List[Tuple[str, float]]:
+        """(key, score) pairs, best first; score is share of query trigrams in key"""
+        grams = trigrams(query, closed=False)
+        if not grams:
+            # Single character - too short to look up
+            return []
+        counts: Dict[str, int] = {}
+        for gram in grams:
+            for key in self._postings.get(gram, ()):
+                counts[key] = counts.get(key, 0) + 1
+
+        scored = []
+        for key, count in counts.items():
+            score = count / len(grams)
+            if query in key:
+                # Exact substring (e.g. middle of a user id) always qualifies
+                score = max(score, 1.0)
+            if score >= min_score:
+                scored.append((key, score))
+        # Closest length first among equal scores: "john" before "johnny_b"
+        scored.sort(key=lambda item: (-item[1], len(item[0]), item[0]))
+        return scored
+
+    def values(self, key: str) -> Set[int]:
+        return self._keys.get(key, set())
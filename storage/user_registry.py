@@ -0,0 +1,220 @@
+"""
+Compact user registry for DataManager
+
+User records are small dicts with the same few keys, and with many users
+the per-dict and per-key overhead is most of their memory. The registry
+keeps one row per user (integer id) in parallel columns instead:
+
+    locale, thanked               - 1-byte codes into a table of distinct values
+    last_review, last_suggestion  - epoch seconds in array('d')
+
+Values a column can't hold exactly, and any other keys, are kept as is in
+a per-user overflow dict, so exported records equal what was stored.
+"""
+
+import copy
+import math
+from array import array
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+from config import TIMEZONE
+
+# Column value meaning "record has no such key"
+_MISSING = object()
+
+
+class _CodeColumn:
+    """Few distinct values (str, bool, None) stored as 1-byte codes; 0 = key not set"""
+
+    missing = 0
+
+    def __init__(self):
+        self.data = bytearray()
+        self._values: List[object] = [_MISSING]
+        # Keyed by type too, so True and 1 don't share a code
+        self._codes: Dict[tuple, int] = {}
+
+    def encode(self, value) -> Optional[int]:
+        if value is not None and type(value) not in (str, bool):
+            return None
+        key = (type(value), value)
+        code = self._codes.get(key)
+        if code is None:
+            if len(self._values) > 255:
+                return None
+            code = self._codes[key] = len(self._values)
+            self._values.append(value)
+        return code
+
+    def decode(self, code: int):
+        return self._values[code]
+
+
+class _TimeColumn:
+    """ISO timestamps as epoch seconds; nan = key not set, -inf = None"""
+
+    missing = math.nan
+
+    def __init__(self):
+        self.data = array("d")
+
+    def encode(self, value) -> Optional[float]:
+        if value is None:
+            return -math.inf
+        if not isinstance(value, str):
+            return None
+        try:
+            stamp = datetime.fromisoformat(value).timestamp()
+        except ValueError:
+            return None
+        # Only values that come back unchanged (aware, in configured timezone)
+        return stamp if self.decode(stamp) == value else None
+
+    def decode(self, stamp: float):
+        if math.isnan(stamp):
+            return _MISSING
+        if stamp == -math.inf:
+            return None
+        return datetime.fromtimestamp(stamp, TIMEZONE).isoformat()
+
+
+class UserRegistry:
+    """User records by integer id, stored column-wise"""
+
+    def __init__(self):
+        self._rows: Dict[int, int] = {}
+        self._ids = array("q")
+        self._columns = {
+            "locale": _CodeColumn(),
+            "thanked": _CodeColumn(),
+            "last_review": _TimeColumn(),
+            "last_suggestion": _TimeColumn()
+        }
+        self._overflow: Dict[int, dict] = {}
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __contains__(self, user_id: Union[int, str]) -> bool:
+        return int(user_id) in self._rows
+
+    def get(self, user_id: Union[int, str]) -> Optional[dict]:
+        """User record as a new dict (None for unknown users)"""
+        user_id = int(user_id)
+        row = self._rows.get(user_id)
+        if row is None:
+            return None
+        return self._record(user_id, row)
+
+    def get_value(self, user_id: Union[int, str], key: str, default=None):
+        """Single field of user record without building the whole dict"""
+        user_id = int(user_id)
+        row = self._rows.get(user_id)
+        if row is None:
+            return default
+        overflow = self._overflow.get(user_id)
+        if overflow and key in overflow:
+            return overflow[key]
+        column = self._columns.get(key)
+        if column is None:
+            return default
+        value = column.decode(column.data[row])
+        return default if value is _MISSING else value
+
+    def set(self, user_id: Union[int, str], data: dict):
+        """Replace user record"""
+        user_id = int(user_id)
+        row = self._rows.get(user_id)
+        if row is None:
+            row = self._add_row(user_id)
+        else:
+            for column in self._columns.values():
+                column.data[row] = column.missing
+            self._overflow.pop(user_id, None)
+        for key, value in data.items():
+            self._set_field(user_id, row, key, value)
+
+    def update(self, user_id: Union[int, str], updates: dict):
+        """Change some fields of user record (creating an empty one if needed)"""
+        user_id = int(user_id)
+        row = self._rows.get(user_id)
+        if row is None:
+            row = self._add_row(user_id)
+        for key, value in updates.items():
+            self._set_field(user_id, row, key, value)
+
+    def remove(self, user_id: Union[int, str]):
+        """Delete user record"""
+        user_id = int(user_id)
+        row = self._rows.pop(user_id, None)
+        if row is None:
+            return
+        self._overflow.pop(user_id, None)
+
+        # Move last row into the freed one so columns stay dense
+        last = len(self._ids) - 1
+        if row != last:
+            moved_id = self._ids[last]
+            self._ids[row] = moved_id
+            for column in self._columns.values():
+                column.data[row] = column.data[last]
+            self._rows[moved_id] = row
+        self._ids.pop()
+        for column in self._columns.values():
+            column.data.pop()
+
+    def items(self) -> Iterator[Tuple[str, dict]]:
+        """(user id as in data.json, record) pairs"""
+        for row, user_id in enumerate(self._ids):
+            yield str(user_id), self._record(user_id, row)
+
+    def copy(self) -> 'UserRegistry':
+        """Copy of columns (no records are built), safe to to_dict() in another thread"""
+        registry = UserRegistry.__new__(UserRegistry)
+        registry._rows = dict(self._rows)
+        registry._ids = array("q", self._ids)
+        registry._columns = {}
+        for key, column in self._columns.items():
+            # Code tables only grow, so the copy can share them
+            registry._columns[key] = clone = copy.copy(column)
+            clone.data = column.data[:]
+        registry._overflow = {user_id: dict(extra) for user_id, extra in self._overflow.items()}
+        return registry
+
+    def to_dict(self) -> Dict[str, dict]:
+        """Plain {user_id: record} form for data.json"""
+        return dict(self.items())
+
+    def _add_row(self, user_id: int) -> int:
+        row = len(self._ids)
+        self._ids.append(user_id)
+        for column in self._columns.values():
+            column.data.append(column.missing)
+        self._rows[user_id] = row
+        return row
+
+    def _set_field(self, user_id: int, row: int, key: str, value):
+        column = self._columns.get(key)
+        if column is not None:
+            code = column.encode(value)
+            if code is not None:
+                column.data[row] = code
+                overflow = self._overflow.get(user_id)
+                if overflow and key in overflow:
+                    del overflow[key]
+                    if not overflow:
+                        del self._overflow[user_id]
+                return
+            column.data[row] = column.missing
+        self._overflow.setdefault(user_id, {})[key] = value
+
+    def _record(self, user_id: int, row: int) -> dict:
+        record = {}
+        for key, column in self._columns.items():
+            value = column.decode(column.data[row])
+            if value is not _MISSING:
+                record[key] = value
+        overflow = self._overflow.get(user_id)
+        if overflow:
+            record.update(overflow)
+        return record
@@ -36,16 +36,10 @@ def format_ticket_brief(ticket) -> str:
         username = f"ID:{ticket.user_id}"
 
     try:
-        if ticket.messages:
-            first_msg = ticket.messages[0]
-            # Handle Message object (has 'text' attribute)
-            if hasattr(first_msg, 'text'):
-                msg_preview = (first_msg.text[:30] + "...") if first_msg.text else "[empty]"
-            # Handle dict format
-            elif isinstance(first_msg, dict):
-                msg_preview = (first_msg.get("text", "")[:30] + "...") if first_msg.get("text") else "[empty]"
-            else:
-                msg_preview = str(first_msg)[:30] + "..."
+        # Preview reads the first message without decoding the whole history
+        if ticket.message_count:
+            first_text = ticket.first_message_text
+            msg_preview = (first_text[:30] + "...") if first_text else "[empty]"
         else:
             msg_preview = "[no messages]"
     except Exception:
@@ -209,16 +203,9 @@ def format_ticket_preview(ticket) -> str:
     created_str = ticket.created_at.strftime("%d.%m.%Y %H:%M")
 
     try:
-        if ticket.messages:
-            first_msg = ticket.messages[0]
-            # Handle Message object
-            if hasattr(first_msg, 'text'):
-                msg_preview = first_msg.text[:100] if first_msg.text else "[empty]"
-            # Handle dict format
-            elif isinstance(first_msg, dict):
-                msg_preview = first_msg.get("text", "")[:100] if first_msg.get("text") else "[empty]"
-            else:
-                msg_preview = str(first_msg)[:100]
+        if ticket.message_count:
+            first_text = ticket.first_message_text
+            msg_preview = first_text[:100] if first_text else "[empty]"
         else:
             msg_preview = get_text("ui.no_messages", lang=admin_lang)
     except Exception:
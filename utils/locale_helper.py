@@ -35,8 +35,7 @@ def get_user_language(user_id: int) -> str:
             return lang
 
         # Try storage (persistent)
-        user_data = data_manager.get_user_data(user_id)
-        lang = user_data.get("locale")
+        lang = data_manager.get_user_locale(user_id)
         if lang:
             locales_set_user_locale(user_id, lang)
             return lang
@@ -55,9 +54,7 @@ def get_admin_language() -> str:
         Admin's language code or default
     """
     try:
-        admin_data = data_manager.get_user_data(ADMIN_ID)
-        lang = admin_data.get("locale", DEFAULT_LOCALE)
-        return lang
+        return data_manager.get_user_locale(ADMIN_ID) or DEFAULT_LOCALE
     except Exception as e:
         logger.warning(f"Failed to load admin locale: {e}")
         return DEFAULT_LOCALE